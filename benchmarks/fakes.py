@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Offline stand-ins for the benchmark suite
+A fake WebDriver/WebElement pair backed by a saved results page that counts every
+chromedriver round trip, a local yad2 page server, a local image CDN and a local SMTP sink
+"""
+
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import feed_parser
+from main import FEED_COUNT_SCRIPT, FEED_EXTRACTION_SCRIPT, FEED_IDS_SCRIPT
+
+
+class RoundTripCounter:
+    """Counts simulated WebDriver HTTP round trips"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        """Record one round trip"""
+        with self._lock:
+            self.count += 1
+
+    def reset(self):
+        """Start counting from zero again"""
+        with self._lock:
+            self.count = 0
+
+
+class FakeWebElement:
+    """Minimal WebElement over a BeautifulSoup tag; every call is one round trip"""
+
+    def __init__(self, tag, counter):
+        self._tag = tag
+        self._counter = counter
+
+    @property
+    def text(self):
+        self._counter.hit()
+        return " ".join(self._tag.get_text(" ").split())
+
+    def find_element(self, by, value):
+        from selenium.common.exceptions import NoSuchElementException
+
+        self._counter.hit()
+        match = self._tag.select_one(value)
+        if match is None:
+            raise NoSuchElementException(f"no element for {value}")
+        return FakeWebElement(match, self._counter)
+
+    def get_attribute(self, name):
+        self._counter.hit()
+        if name == 'outerHTML':
+            return str(self._tag)
+        value = self._tag.get(name)
+        if name == 'href' and value:
+            # Live WebElements resolve href against the page URL
+            return feed_parser.build_link(value)
+        return value
+
+
+class FakeWebDriver:
+    """Serves a saved results page to the scraper's extraction code"""
+
+    def __init__(self, html, counter=None):
+        from bs4 import BeautifulSoup
+
+        self.page_source = html
+        self.counter = counter or RoundTripCounter()
+        self._soup = BeautifulSoup(html, 'lxml')
+
+    def get(self, url):
+        self.counter.hit()
+        self.current_url = url
+
+    def find_elements(self, by, value):
+        self.counter.hit()
+        return [FakeWebElement(tag, self.counter) for tag in self._soup.select(value)]
+
+    def execute_script(self, script, *args):
+        self.counter.hit()
+        cards = self._soup.select(feed_parser.FEED_ITEM_SELECTOR)
+        if script == FEED_COUNT_SCRIPT:
+            return len(cards)
+        if script == FEED_IDS_SCRIPT:
+            return [card.get('href') or '' for card in cards]
+        if script == FEED_EXTRACTION_SCRIPT:
+            if args and args[0] is not None:
+                return [self._raw_card(cards[i]) if i < len(cards) else None for i in args[0]]
+            return [self._raw_card(card) for card in cards]
+        raise NotImplementedError("FakeWebDriver only understands the scraper's own scripts")
+
+    @staticmethod
+    def _raw_card(card):
+        """Mirror what FEED_EXTRACTION_SCRIPT returns for one card"""
+        text = feed_parser._select_text
+        image = card.select_one(feed_parser.MAIN_IMAGE_SELECTOR)
+        return {
+            'model': text(card, feed_parser.HEADING_SELECTOR),
+            'marketing_text': text(card, feed_parser.MARKETING_TEXT_SELECTOR),
+            'year_and_yad': text(card, feed_parser.YEAR_AND_HAND_SELECTOR),
+            'price': text(card.select_one(feed_parser.PRIVATE_SECTION_SELECTOR), feed_parser.PRICE_SELECTOR),
+            'agency': next(filter(None, (text(card, s) for s in feed_parser.AGENCY_SELECTORS)), ''),
+            'href': feed_parser.build_link(card.get('href')) or '',
+            'image_url': (image.get('src') or image.get('data-src') or '') if image else '',
+        }
+
+    def quit(self):
+        pass
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Serves recorded pages by path; unknown paths get a 404"""
+
+    pages = {}
+
+    def do_GET(self):
+        status, body = self.pages.get(self.path.split('?')[0], (404, "Not Found"))
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_page_server(pages):
+    """Start a local stand-in for yad2 serving {path: (status, html)}; returns (server, base_url)"""
+    handler = type('PageHandler', (_PageHandler,), {'pages': pages})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """Serves a fixed-size JPEG-ish payload for any path"""
+
+    payload = b""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_image_cdn(image_bytes=60_000):
+    """Start a local image CDN; returns (server, base_url)"""
+    # A JFIF header is enough for MIMEImage to recognise the payload as a JPEG
+    header = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+    handler = type('ImageHandler', (_ImageHandler,), {'payload': header + b"\0" * (image_bytes - len(header))})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class _SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail without TLS or auth"""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self._reply("220 localhost benchmark sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self._reply("250 localhost")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b".\n", b""):
+                        break
+                    size += len(data_line)
+                self.server.message_sizes.append(size)
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Local SMTP server that records the size of every message it receives"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SmtpSinkHandler)
+        self.connections = 0
+        self.message_sizes = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        """Port the sink is listening on"""
+        return self.server_address[1]
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the extraction and notification hot paths
+Runs against a saved results page, a fake WebDriver that counts round trips and local
+yad2/image CDN/SMTP stand-ins, so nothing touches yad2.co.il or Gmail. Recorded search
+responses are also checked through the HTTP fetch path (exit status 1 on a mismatch)
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import feed_parser  # noqa: E402
+from listing import Listing  # noqa: E402
+from listing_history import ListingHistory  # noqa: E402
+from market_scorer import MarketScorer  # noqa: E402
+from fakes import FakeWebDriver, SmtpSink, start_image_cdn, start_page_server  # noqa: E402
+from main import Yad2CarScraper  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(BENCHMARK_DIR, 'fixtures', 'feed_page.html')
+SEARCH_PAGE_FIXTURE = os.path.join(BENCHMARK_DIR, 'fixtures', 'search_page_state.html')
+EMPTY_PAGE_FIXTURE = os.path.join(BENCHMARK_DIR, 'fixtures', 'search_page_empty.html')
+# Feed order of the recorded search page; its recommendations and "similar cars" items are not results
+SEARCH_PAGE_TOKENS = ['plt4kq2m', 'pf91dhod', 'j8ht9lgm', 'xg9edn58', 'pft75v2s', 'ujzde8gx',
+                      'zdoc9is0', '1u33xtpl', '0ce9uvw5', 'h5dnsipz', 'jfljooa5']
+DIGEST_SIZES = (1, 20, 200)
+HISTORY_ROWS = 5000
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the scraper's progress prints while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def timed(func, repeat=1):
+    """Return (seconds per call, last result) over `repeat` calls"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def make_scraper(smtp_port):
+    """Build a scraper whose notifications go to the local stand-ins"""
+    scraper = Yad2CarScraper()
+    scraper.config = copy.deepcopy(scraper.config)
+    scraper.config['notification_settings']['email'].update({
+        'enabled': True,
+        'smtp_server': '127.0.0.1',
+        'smtp_port': smtp_port,
+        'smtp_starttls': False,
+        'sender_email': 'bench@localhost',
+        'sender_password': '',
+        'recipient_email': 'inbox@localhost',
+    })
+    scraper.config['notification_settings']['dispatcher'].update({
+        'outbox_path': os.path.join(tempfile.mkdtemp(), 'outbox.db'),
+        'min_interval_seconds': {},
+    })
+    return scraper
+
+
+def bench_search_url(scraper, results):
+    """build_search_url for the configured preferences"""
+    seconds, _ = timed(scraper.build_search_url, repeat=2000)
+    results['build_search_url.us_per_call'] = seconds * 1e6
+
+
+def bench_extraction(scraper, html, per_element_sample, results):
+    """Per-card latency and chromedriver round trips for every extraction mode"""
+    # Per-element: every field is its own round trip (and retry delay), so only sample a few cards
+    driver = FakeWebDriver(html)
+    elements = driver.find_elements('css selector', feed_parser.FEED_ITEM_SELECTOR)[:per_element_sample]
+    driver.counter.reset()
+    with quiet():
+        seconds, _ = timed(lambda: [scraper.extract_car_data(element) for element in elements])
+    results['extract.per_element.ms_per_card'] = seconds * 1000 / len(elements)
+    results['extract.per_element.round_trips_per_card'] = driver.counter.count / len(elements)
+
+    # Batch: one injected script for the whole feed
+    driver = FakeWebDriver(html)
+    with quiet():
+        seconds, cars = timed(lambda: scraper.extract_all_cars(driver))
+    results['extract.batch.ms_per_card'] = seconds * 1000 / len(cars)
+    results['extract.batch.round_trips_per_card'] = driver.counter.count / len(cars)
+
+    # Offline parsing of the captured page and of the embedded JSON state (no round trips)
+    seconds, cars = timed(lambda: feed_parser.parse_feed_html(html), repeat=5)
+    results['extract.page_source.ms_per_card'] = seconds * 1000 / len(cars)
+    seconds, cars = timed(lambda: feed_parser.parse_embedded_feed(html), repeat=5)
+    results['extract.embedded_json.ms_per_card'] = seconds * 1000 / len(cars)
+    return cars
+
+
+def bench_two_phase(scraper, html, cars, results):
+    """Steady-state page (all but two cards already seen): IDs first, then only the new cards"""
+    known_ids = {car.id for car in cars[2:]}
+    for mode in ('batch', 'per_element'):
+        driver = FakeWebDriver(html)
+
+        def extract():
+            card_count, known_cards, new_indices = scraper.read_known_listings(driver, known_ids)
+            if mode == 'batch':
+                return scraper.extract_all_cars(driver, new_indices)
+            elements = driver.find_elements('css selector', feed_parser.FEED_ITEM_SELECTOR)
+            return [scraper.extract_car_data(elements[i]) for i in new_indices]
+
+        with quiet():
+            seconds, _ = timed(extract)
+        results[f'extract.two_phase.{mode}.ms_per_page'] = seconds * 1000
+        results[f'extract.two_phase.{mode}.round_trips_per_page'] = driver.counter.count
+
+
+def bench_market_scoring(cars, results):
+    """Score a digest's worth of new cars against a synthetic 5000-row listing history"""
+    history = ListingHistory(path=os.path.join(tempfile.mkdtemp(), 'history.npz')).load()
+    now = time.time()
+    for i in range(HISTORY_ROWS):
+        car = copy.copy(cars[i % len(cars)])
+        car.id = f"history-{i}"
+        car.price = 60_000 + (i * 7919) % 60_000
+        car.year = 2014 + i % 10
+        history.observe(car, now=now - (i % 90) * 86400)
+    new_cars = cars[:20]
+    exclude_ids = {car.id for car in new_cars}
+    seconds, _ = timed(lambda: MarketScorer.from_history(history, exclude_ids=exclude_ids).score(new_cars), repeat=5)
+    results[f'market.score_{HISTORY_ROWS}_rows_ms'] = seconds * 1000
+
+
+def bench_listing_memory(cars, results, count=1000):
+    """Bytes allocated per parsed Listing, from the page's raw text fields"""
+    raw = [car.to_dict() for car in cars]
+    for fields in raw:
+        fields.update(price=f"₪ {fields['price']:,}" if fields['price'] else "", year=str(fields['year'] or ""),
+                      hand=f"יד {fields['hand']}" if fields['hand'] else "")
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    listings = [Listing.from_dict(raw[i % len(raw)]) for i in range(count)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    results['listing.bytes_per_record'] = allocated / len(listings)
+
+
+def digest_cars(base_cars, count, cdn_url):
+    """Cycle the fixture cars up to `count`, pointing their images at the local CDN"""
+    cars = []
+    for i in range(count):
+        car = copy.copy(base_cars[i % len(base_cars)])
+        car.id = f"{car.id}-{i}"
+        car.image_url = f"{cdn_url}/Pic/{i}.jpeg?c=3&w=1200&h=900"
+        cars.append(car)
+    return cars
+
+
+def bench_digests(scraper, base_cars, cdn_url, smtp_sink, results):
+    """HTML build time, full send time (queued through the dispatcher) and message size for 1/20/200-car digests"""
+    for count in DIGEST_SIZES:
+        cars = digest_cars(base_cars, count, cdn_url)
+        seconds, _ = timed(lambda: scraper._create_html_email_body("", cars), repeat=5)
+        results[f'digest.{count}.html_build_ms'] = seconds * 1000
+
+        sent_before = len(smtp_sink.message_sizes)
+        with quiet():
+            seconds, _ = timed(lambda: (scraper.send_comprehensive_email(cars), scraper.drain_notifications()))
+        results[f'digest.{count}.send_ms'] = seconds * 1000
+        if len(smtp_sink.message_sizes) > sent_before:
+            results[f'digest.{count}.bytes'] = smtp_sink.message_sizes[-1]
+    scraper.close_smtp_transport()
+    results['digest.smtp_connections'] = smtp_sink.connections
+
+
+def read_fixture(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def check_http_fetch(scraper, results):
+    """Run recorded responses through fetch_cars_http via a local yad2 stand-in; returns the failed checks"""
+    server, base_url = start_page_server({
+        '/results': (200, read_fixture(SEARCH_PAGE_FIXTURE)),
+        '/past-the-end': (200, read_fixture(EMPTY_PAGE_FIXTURE)),
+        '/captcha': (200, "<html><body>Are you for real? perfdrive captcha</body></html>"),
+    })
+    failures = []
+    with quiet():
+        seconds, cars = timed(lambda: scraper.fetch_cars_http(f"{base_url}/results"))
+        outcomes = {path: scraper.fetch_cars_http(f"{base_url}{path}")
+                    for path in ('/past-the-end', '/captcha', '/missing')}
+    server.shutdown()
+
+    tokens = [car.id for car in cars or []]
+    if tokens != SEARCH_PAGE_TOKENS:
+        failures.append(f"search page: expected {SEARCH_PAGE_TOKENS}, got {tokens}")
+    if outcomes['/past-the-end'] != []:
+        failures.append(f"past-the-end page: expected no listings, got {outcomes['/past-the-end']!r}")
+    for path in ('/captcha', '/missing'):
+        if outcomes[path] is not None:
+            failures.append(f"{path}: expected a browser fallback (None), got {outcomes[path]!r}")
+    results['fetch.http.ms_per_page'] = seconds * 1000
+    return failures
+
+
+def compare(results, baseline, tolerance):
+    """Return the metrics that got worse than baseline * (1 + tolerance); lower is always better"""
+    regressions = []
+    for name, value in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if value > previous * (1 + tolerance) and value - previous > 1e-9:
+            regressions.append((name, previous, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Yad2 scraper hot paths")
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE, help="saved results page to benchmark against")
+    parser.add_argument('--per-element-sample', type=int, default=3,
+                        help="cards to time in per_element mode (each field has a retry delay)")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--baseline', help="fail if any metric regresses against this results file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed regression ratio (default 0.25)")
+    parser.add_argument('--save-baseline', help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    html = read_fixture(args.fixture)
+
+    cdn_server, cdn_url = start_image_cdn()
+    smtp_sink = SmtpSink()
+    with quiet():
+        scraper = make_scraper(smtp_sink.port)
+
+    results = {}
+    failures = check_http_fetch(scraper, results)
+    bench_search_url(scraper, results)
+    cars = bench_extraction(scraper, html, args.per_element_sample, results)
+    bench_two_phase(scraper, html, cars, results)
+    bench_market_scoring(cars, results)
+    bench_listing_memory(cars, results)
+    bench_digests(scraper, cars, cdn_url, smtp_sink, results)
+
+    cdn_server.shutdown()
+    smtp_sink.shutdown()
+
+    print("📊 Benchmark results")
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        print(f"   {name.ljust(width)}  {value:12.3f}")
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            print(f"💾 Wrote {path}")
+
+    if failures:
+        print(f"❌ {len(failures)} recorded-response checks failed:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} metrics regressed more than {args.tolerance:.0%}:")
+            for name, previous, value in regressions:
+                print(f"   {name}: {previous:.3f} -> {value:.3f}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
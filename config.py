@@ -29,6 +29,10 @@ CONFIG = {
             "max": 130000
         }
     },
+    # Named searches scraped concurrently, each with its own seen-state namespace and email digest.
+    # Leave empty to scrape "car_preferences" above as a single profile. Example:
+    # {"name": "lexus-hybrids", "car_preferences": {...}, "recipient_email": "someone@example.com"}
+    "search_profiles": [],
     "notification_settings": {
         "whatsapp": {
             # Environment Variables (Non-sensitive configuration)
@@ -40,21 +44,128 @@ CONFIG = {
             "enabled": os.getenv('EMAIL_ENABLED', 'True').lower() == 'true',
             "smtp_server": os.getenv('EMAIL_SMTP_SERVER', 'smtp.gmail.com'),
             "smtp_port": int(os.getenv('EMAIL_SMTP_PORT', '587')),
+            "smtp_starttls": os.getenv('EMAIL_SMTP_STARTTLS', 'True').lower() == 'true',
             "sender_email": os.getenv('EMAIL_SENDER', 'your_email@gmail.com'),
+            # Comma-separate several addresses to send one batch to all of them
             "recipient_email": os.getenv('EMAIL_RECIPIENT', 'recipient@gmail.com'),
+            # Digest images are downloaded in parallel; those missing the deadline are sent as links
+            "image_fetch_concurrency": 6,
+            "image_fetch_deadline_seconds": 15,
+            # Images are requested as smaller CDN renditions and capped per image and per email
+            "image_width": 640,
+            "max_image_bytes": 200_000,
+            "max_email_image_bytes": 2_000_000,
             
             # SECRETS (Sensitive credentials - should be managed securely)
             "sender_password": os.getenv('EMAIL_APP_PASSWORD', 'your_app_password'),
         },
+        "dispatcher": {
+            # Queued notifications are delivered in the background with retries and exponential backoff.
+            # The outbox lives in the seen-state file, so undelivered alerts are committed with it
+            "enabled": True,
+            "outbox_path": "seen_cars.db",
+            # Per-car WhatsApp alerts on top of the email digest
+            "whatsapp_alerts": False,
+            "min_interval_seconds": {"whatsapp": 1.0, "email": 1.0},
+            "max_attempts": 8,
+            "backoff_base_seconds": 2,
+            "backoff_max_seconds": 300,
+            # How long a run waits for queued notifications before leaving them to the next run
+            "drain_timeout_seconds": 120
+        },
         "twilio": {
             # SECRETS (Sensitive credentials - should be managed securely)
             "account_sid": os.getenv('TWILIO_ACCOUNT_SID', 'your_twilio_account_sid'),
             "auth_token": os.getenv('TWILIO_AUTH_TOKEN', 'your_twilio_auth_token')
         }
     },
+    "seen_store": {
+        # "journal" keeps seen IDs as a text snapshot + append-only journal in journal_dir, so runs
+        # without new cars change nothing in git; "sqlite" uses the single seen_cars.db file.
+        # Older seen_cars.db / seen_cars.json state is imported automatically on first run
+        "backend": "journal",
+        "journal_dir": "seen_state",
+        # Fold the journal into the snapshot once it reaches this many lines
+        "compact_after_entries": 1000,
+        # Still-listed cars only get their last_seen rewritten this often (keeps the TTL meaningful)
+        "touch_resolution_days": 7,
+        "path": "seen_cars.db",
+        "legacy_json_path": "seen_cars.json",
+        # Listings not seen for this many days are forgotten; the store never exceeds max_entries
+        "ttl_days": 90,
+        "max_entries": 5000
+    },
+    "sharding": {
+        # `main.py --shard I/N` workers write their seen IDs, history and queued notifications here
+        # instead of the shared state; `main.py --merge-shards` folds them back in and sends the alerts
+        "delta_dir": "shard_deltas"
+    },
+    "listing_history": {
+        # Columnar history of every observed listing (parsed price/year/hand, first/last seen),
+        # used to rate new cars against the same model and year
+        "enabled": True,
+        "path": "listing_history.npz",
+        "retention_days": 365,
+        # A car is flagged "below market" when it is this much under its group's median price,
+        # and only once the group has at least min_comparables listings
+        "below_market_threshold": 0.05,
+        "min_comparables": 5
+    },
+    "metrics": {
+        # One JSON line per run with per-stage timings (p50/p95/max) and counters
+        "jsonl_path": os.getenv('METRICS_JSONL_PATH', 'metrics/runs.jsonl'),
+        # Optional Prometheus textfile (e.g. for node_exporter's textfile collector); empty disables it
+        "prometheus_textfile_path": os.getenv('METRICS_PROMETHEUS_PATH', '')
+    },
     "scraping_settings": {
         "check_interval_minutes": 15,
-        "max_results_per_check": 20,
-        "timeout_minutes": 3
+        # Pages are walked lazily until a run of already-seen cars, a page with nothing new, an empty
+        # or short (last) page, or the page cap. Listings read per search per run, across all pages
+        "max_results_per_check": 200,
+        "max_pages": 5,
+        "stop_after_seen_streak": 10,
+        # Maximum number of Chrome instances shared by concurrently scraped search profiles
+        "browser_pool_size": 2,
+        # Profiles with the same engine/gearbox/mileage filters share one search (models comma-joined,
+        # price/year ranges widened) and each result is routed back to the profiles it matches
+        "merge_profile_queries": True,
+        # Verified chromedriver per Chrome version, so webdriver-manager only runs when versions change
+        "driver_cache_path": "~/.cache/yad2-scraper/chromedriver.json",
+        # "http" reads the embedded feed JSON with plain requests and only starts Chrome as a fallback,
+        # "browser" always uses Selenium
+        "fetch_mode": "http",
+        "http_timeout_seconds": 15,
+        # "batch" reads the whole feed with one injected script, "page_source" parses the captured HTML
+        # offline (browser closed first), "per_element" queries each card field
+        "extraction_mode": "batch",
+        # Read only the listing IDs first and fully extract just the cards not in the seen-store
+        "two_phase_extraction": True,
+        # Open the item page of each new listing for mileage, test date, location and description,
+        # so mileage.max is checked exactly. Details are cached per listing ID for cache_ttl_days
+        "detail_enrichment": {
+            "enabled": False,
+            "concurrency": 4,
+            "deadline_seconds": 30,
+            "cache_path": "~/.cache/yad2-scraper/listing_details.json",
+            "cache_ttl_days": 14
+        },
+        "timeout_minutes": 3,
+        # Lean browsing: eager page loads, no images, and no fonts/media/third-party trackers
+        "lean_browser": {
+            "enabled": True,
+            "block_images": True,
+            "blocked_url_patterns": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm", "*.m3u8"],
+            "blocked_hosts": [
+                "googletagmanager.com", "google-analytics.com", "doubleclick.net", "googlesyndication.com",
+                "facebook.net", "hotjar.com", "taboola.com", "outbrain.com"
+            ]
+        },
+        # Daemon mode (python main.py --daemon): restart the warm browsers after N cycles or past this JS heap size
+        "recycle_driver_after_cycles": 20,
+        "recycle_driver_memory_mb": 512,
+        # Feed readiness: poll until the listing count is stable for N polls (0 only once the page has fully loaded), up to the ceiling
+        "feed_wait_timeout_seconds": 20,
+        "feed_poll_interval_seconds": 0.25,
+        "feed_stable_polls": 3
     }
 } 
\ No newline at end of file
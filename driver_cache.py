@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+ChromeDriver resolution cache
+Remembers which verified chromedriver binary matches the installed Chrome version, so
+runs only go through webdriver-manager (network lookup/download) when the versions disagree
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+
+CHROME_BINARIES = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+VERSION_PATTERN = re.compile(r"(\d+)\.\d+\.\d+(?:\.\d+)?")
+
+
+def _read_version(command):
+    """Run `<binary> --version` and return the dotted version it reports, or None"""
+    try:
+        output = subprocess.run(
+            [command, "--version"], capture_output=True, text=True, timeout=10
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_PATTERN.search(output or "")
+    return match.group(0) if match else None
+
+
+def get_chrome_version():
+    """Return the installed Chrome version (e.g. '120.0.6099.109'), or None if it can't be found"""
+    if sys.platform.startswith("win"):
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon") as key:
+                return winreg.QueryValueEx(key, "version")[0]
+        except OSError:
+            return None
+    for binary in CHROME_BINARIES:
+        version = _read_version(binary)
+        if version:
+            return version
+    return None
+
+
+def _major(version):
+    """Return the major component of a dotted version string"""
+    return version.split('.')[0] if version else None
+
+
+def _signature(path):
+    """Size and mtime of a binary, used to detect it changing underneath the cache"""
+    stat_result = os.stat(path)
+    return [stat_result.st_size, int(stat_result.st_mtime)]
+
+
+class DriverCache:
+    """JSON cache of chrome major version -> verified chromedriver path"""
+
+    def __init__(self, cache_path):
+        self.cache_path = os.path.expanduser(cache_path)
+
+    def _load(self):
+        """Read the cache file, treating a missing or corrupt file as empty"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, entries):
+        """Atomically rewrite the cache file"""
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def lookup(self, chrome_version):
+        """Return the cached driver path for this Chrome version if it is still valid"""
+        entry = self._load().get(_major(chrome_version) or "")
+        if not entry:
+            return None
+        driver_path = entry.get('driver_path')
+        try:
+            if not os.access(driver_path, os.X_OK) or _signature(driver_path) != entry.get('signature'):
+                return None
+        except (OSError, TypeError):
+            return None
+        return driver_path
+
+    def record(self, chrome_version, driver_path):
+        """Verify a freshly installed driver matches Chrome and remember it"""
+        driver_version = _read_version(driver_path)
+        if not chrome_version or _major(driver_version) != _major(chrome_version):
+            print(f"⚠️ Not caching chromedriver {driver_version} for Chrome {chrome_version}")
+            return False
+        entries = self._load()
+        entries[_major(chrome_version)] = {
+            'chrome_version': chrome_version,
+            'driver_version': driver_version,
+            'driver_path': driver_path,
+            'signature': _signature(driver_path),
+        }
+        self._store(entries)
+        return True
+
+    def resolve(self, install_driver):
+        """Return a chromedriver path, only calling install_driver() on a cache miss.
+
+        Returns (driver_path, cache_hit).
+        """
+        chrome_version = get_chrome_version()
+        cached_path = self.lookup(chrome_version) if chrome_version else None
+        if cached_path:
+            return cached_path, True
+
+        driver_path = install_driver()
+        try:
+            self.record(chrome_version, driver_path)
+        except OSError as e:
+            print(f"⚠️ Could not update driver cache: {e}")
+        return driver_path, False
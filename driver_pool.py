@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Bounded pool of reusable WebDrivers
+Drivers are created lazily up to the pool size and handed out to concurrent profile scrapes
+"""
+
+import queue
+import threading
+
+
+class DriverPool:
+    """Hands out at most `size` live drivers, reusing them between borrowers"""
+
+    def __init__(self, driver_factory, size=2):
+        self.driver_factory = driver_factory
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._drivers = []
+
+    def acquire(self):
+        """Return an idle driver, start a new one if under the limit, or wait for one to be released"""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                try:
+                    driver = self.driver_factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                with self._lock:
+                    self._drivers.append(driver)
+                return driver
+
+            # Wake up periodically in case a discarded driver freed a slot
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def drivers(self):
+        """Return a snapshot of every live driver the pool has started"""
+        with self._lock:
+            return list(self._drivers)
+
+    def release(self, driver):
+        """Return a healthy driver to the pool"""
+        with self._lock:
+            owned = driver in self._drivers
+        if owned:
+            self._idle.put(driver)
+            return
+        # The pool was closed while this driver was borrowed; don't hand it out again
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def discard(self, driver):
+        """Quit a broken driver and free its slot"""
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self._created -= 1
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"⚠️ Failed to quit driver: {e}")
+
+    def close_all(self):
+        """Quit every driver the pool has started"""
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+            self._created = 0
+        self._idle = queue.Queue()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"⚠️ Failed to quit driver: {e}")
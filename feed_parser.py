@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Yad2 Feed Parser
+Builds Listing records from raw results-page HTML (driver.page_source, a saved file or
+a plain HTTP response) without a live browser
+"""
+
+import hashlib
+import json
+import sys
+
+from listing import PRIVATE_SELLER, UNKNOWN_MODEL, Listing, parse_km
+
+# Selectors for the real yad2 feed markup (shared with the live Selenium extraction)
+FEED_ITEM_SELECTOR = '[data-nagish="feed-item-base-link"]'
+HEADING_SELECTOR = '.feed-item-info_heading__k5pVC'
+MARKETING_TEXT_SELECTOR = '.feed-item-info_marketingText__eNE4R'
+YEAR_AND_HAND_SELECTOR = '.feed-item-info_yearAndHandBox___JLbc'
+PRIVATE_SECTION_SELECTOR = '[data-testid="private-item-left-side"]'
+PRICE_SELECTOR = '.price_price__xQt90'
+AGENCY_SELECTORS = [
+    '.commercial-item-left-side_agencyName__psfbp',
+    '.ultra-plus-item-left-side_agencyName__0Aand',
+]
+MAIN_IMAGE_SELECTOR = '[data-nagish="feed-item-main-image"]'
+
+# Listing lists of the search feed query in the embedded state, in page order; other queries
+# and props (recommendations, "similar cars" carousels) are not search results
+FEED_LIST_KEYS = ('platinum', 'boost', 'solo', 'commercial', 'private')
+
+
+def split_year_and_yad(text):
+    """Split the '<year> • <hand>' box text into year and yad parts"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    parts = [part.strip() for part in text.split('•')]
+    return {
+        'year': parts[0] if len(parts) > 0 else "",
+        'yad': parts[1] if len(parts) > 1 else ""
+    }
+
+
+def build_link(href):
+    """Build a full ad URL from a listing href"""
+    if not href:
+        return None
+    # Build full URL from relative href
+    if href.startswith('item/'):
+        return f"https://www.yad2.co.il/{href}"
+    elif href.startswith('http'):
+        return href  # Already full URL
+    else:
+        return f"https://www.yad2.co.il/{href.lstrip('/')}"
+
+
+def listing_id(link):
+    """Return the item token of an ad URL (https://www.yad2.co.il/item/kdqeegdr?... -> kdqeegdr), or None"""
+    if not link or 'item/' not in link:
+        return None
+    # Get the part after 'item/' and before any query parameters
+    return link.split('item/')[-1].split('?')[0] or None
+
+
+def build_known_listing(car_id, link):
+    """Placeholder for an already-seen card that was not fully extracted"""
+    return Listing(car_id, link=link, known=True)
+
+
+def build_listing(model, price, year, yad, marketing_text, agency, link, image_url):
+    """Parse one card's fields into the Listing shared by all extraction modes"""
+    # Generate unique ID from link
+    car_id = listing_id(link)
+    if not car_id:
+        # Fallback: use element text content hash
+        content = f"{model}_{price}_{year}_{yad}_{marketing_text}_{agency}"
+        car_id = hashlib.md5(content.encode()).hexdigest()[:8]
+
+    return Listing.parse(car_id, model, price, year, yad, marketing_text, agency, link, image_url)
+
+
+def _select_text(root, selector):
+    """Return the whitespace-normalized text of the first match, like WebElement.text"""
+    if root is None:
+        return ""
+    elem = root.select_one(selector)
+    if elem is None:
+        return ""
+    return " ".join(elem.get_text(" ").split())
+
+
+def parse_feed_item(card):
+    """Build a Listing from a single feed card tag"""
+    model = _select_text(card, HEADING_SELECTOR) or UNKNOWN_MODEL
+    marketing_text = _select_text(card, MARKETING_TEXT_SELECTOR)
+
+    year_yad_data = split_year_and_yad(_select_text(card, YEAR_AND_HAND_SELECTOR)) or {}
+    year = year_yad_data.get('year', "")
+    yad = year_yad_data.get('yad', "")
+
+    price_text = _select_text(card.select_one(PRIVATE_SECTION_SELECTOR), PRICE_SELECTOR)
+
+    agency = ""
+    for selector in AGENCY_SELECTORS:
+        agency = _select_text(card, selector)
+        if agency:
+            break
+    agency = agency or PRIVATE_SELLER
+
+    link = build_link(card.get('href')) or ""
+
+    image_url = ""
+    image_elem = card.select_one(MAIN_IMAGE_SELECTOR)
+    if image_elem is not None:
+        # Fallback: try data-src attribute (lazy loading)
+        image_url = image_elem.get('src') or image_elem.get('data-src') or ""
+
+    return build_listing(model, price_text, year, yad, marketing_text, agency, link, image_url)
+
+
+def parse_feed_html(html, known_ids=None):
+    """Parse a yad2 results page and return the Listing of every feed card.
+
+    Cards whose item ID is in known_ids are only read as far as their href and come back
+    as build_known_listing() placeholders.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    cars = []
+    for card in soup.select(FEED_ITEM_SELECTOR):
+        if known_ids is not None:
+            link = build_link(card.get('href'))
+            car_id = listing_id(link)
+            if car_id and car_id in known_ids:
+                cars.append(build_known_listing(car_id, link))
+                continue
+        try:
+            cars.append(parse_feed_item(card))
+        except Exception as e:
+            print(f"❌ Error parsing feed item: {e}")
+    return cars
+
+
+def parse_feed_file(path):
+    """Parse a saved yad2 results page from disk"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_feed_html(f.read())
+
+
+def _find_feed_items(state):
+    """Return the listing dicts of the search feed query in the embedded state, or None if it has none"""
+    page_props = (state.get('props') or {}).get('pageProps') or {}
+    queries = (page_props.get('dehydratedState') or {}).get('queries') or []
+    for query in queries:
+        data = ((query or {}).get('state') or {}).get('data')
+        if not isinstance(data, dict) or not any(isinstance(data.get(key), list) for key in FEED_LIST_KEYS):
+            continue
+        return [item for key in FEED_LIST_KEYS for item in data.get(key) or []
+                if isinstance(item, dict) and item.get('token')]
+    return None
+
+
+def _text_of(value):
+    """Return the display text of a {'id': ..., 'text': ...} field or a plain value"""
+    if isinstance(value, dict):
+        return str(value.get('text') or "").strip()
+    return str(value or "").strip()
+
+
+def parse_embedded_item(item):
+    """Build a Listing from an item in the page's embedded JSON state (numbers are taken as-is)"""
+    model = " ".join(filter(None, [_text_of(item.get('manufacturer')), _text_of(item.get('model'))]))
+
+    year = (item.get('vehicleDates') or {}).get('yearOfProduction') or item.get('year')
+    hand = item.get('hand') or {}
+    hand_id = hand.get('id') if isinstance(hand, dict) else hand
+
+    price = item.get('price')
+    price = price if isinstance(price, (int, float)) else None
+
+    customer = item.get('customer') or {}
+    agency = (customer.get('agencyName') or "").strip()
+
+    meta_data = item.get('metaData') or {}
+    image_url = meta_data.get('coverImage') or next(iter(meta_data.get('images') or []), "") or ""
+
+    marketing_text = _text_of(item.get('marketingText') or item.get('subModel'))
+    link = build_link(f"item/{item['token']}")
+
+    return build_listing(model, price, year, hand_id, marketing_text, agency, link, image_url)
+
+
+def parse_embedded_feed(html):
+    """Parse the search results out of the page's embedded __NEXT_DATA__ JSON state.
+
+    Returns [] for a feed with no results (past the last page) and None when the page carries
+    no feed state at all (a blocked or changed page).
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    script = soup.find('script', id='__NEXT_DATA__')
+    if script is None or not script.string:
+        return None
+
+    items = _find_feed_items(json.loads(script.string))
+    if items is None:
+        return None
+    cars = []
+    seen_tokens = set()
+    for item in items:
+        if item['token'] in seen_tokens:
+            continue
+        seen_tokens.add(item['token'])
+        try:
+            cars.append(parse_embedded_item(item))
+        except Exception as e:
+            print(f"❌ Error parsing embedded item {item.get('token')}: {e}")
+    return cars
+
+
+def _find_item(node, token):
+    """Return the embedded-state dict for one item token, or None"""
+    if isinstance(node, dict):
+        if node.get('token') == token:
+            return node
+        node = list(node.values())
+    if isinstance(node, list):
+        for value in node:
+            found = _find_item(value, token)
+            if found is not None:
+                return found
+    return None
+
+
+def parse_item_details(html, token):
+    """Read mileage, test date, location and description from an item page's embedded JSON state.
+
+    Returns {'km', 'test_date', 'location', 'description'} (missing fields are None), or None
+    when the page carries no state for this item.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    script = soup.find('script', id='__NEXT_DATA__')
+    if script is None or not script.string:
+        return None
+    item = _find_item(json.loads(script.string), token)
+    if item is None:
+        return None
+
+    vehicle_dates = item.get('vehicleDates') or {}
+    test_date = vehicle_dates.get('testDate') or item.get('testDate')
+    address = item.get('address') or {}
+    location = ", ".join(filter(None, [_text_of(address.get('city')), _text_of(address.get('area'))]))
+    meta_data = item.get('metaData') or {}
+    description = _text_of(meta_data.get('description') or item.get('description'))
+    return {
+        'km': parse_km(item.get('km') if item.get('km') is not None else item.get('kilometers')),
+        'test_date': str(test_date)[:10] if test_date else None,
+        'location': location or None,
+        'description': description or None,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python feed_parser.py <saved_results_page.html>")
+        sys.exit(1)
+    print(json.dumps([car.to_dict() for car in parse_feed_file(sys.argv[1])], ensure_ascii=False, indent=2))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Listing record
+One slotted record per results-page listing: price, year and hand are parsed to integers
+once, repeated strings (model, agency) are interned, and the display text used by digests
+and alerts is only formatted when asked for
+"""
+
+import re
+import sys
+import time
+from datetime import datetime
+
+PRIVATE_SELLER = "private person"
+UNKNOWN_MODEL = "Unknown Model"
+
+
+def _first_int(text):
+    """Return the first run of digits in text (thousands separators allowed) as an int, or None"""
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return int(text) or None
+    match = re.search(r"\d[\d,]*", text or "")
+    return int(match.group(0).replace(',', '')) if match else None
+
+
+def parse_price(text):
+    """'₪ 75,000' / '75,000 ₪' / 75000 -> 75000; None when the listing has no price"""
+    return _first_int(text)
+
+
+def parse_year(text):
+    """'2019' / 2019 -> 2019, or None"""
+    year = _first_int(text)
+    return year if year and 1900 < year < 2100 else None
+
+
+def parse_hand(text):
+    """'יד 2' / 2 -> 2, or None"""
+    return _first_int(text)
+
+
+def parse_km(text):
+    """'85,000 ק"מ' / 85000 -> 85000; 0 km is a real reading for new cars"""
+    if text == 0 or text == "0":
+        return 0
+    return _first_int(text)
+
+
+class Listing:
+    """A parsed listing; with known=True only id and link are set (an already-seen card)"""
+
+    __slots__ = ('id', 'model', 'price', 'year', 'hand', 'marketing_text', 'agency', 'link', 'image_url',
+                 'found_at', 'known', 'market', 'km', 'test_date', 'location', 'description')
+
+    def __init__(self, id, model=UNKNOWN_MODEL, price=None, year=None, hand=None, marketing_text="",
+                 agency=PRIVATE_SELLER, link="", image_url="", found_at=None, known=False, market=None):
+        self.id = id
+        self.model = sys.intern(model or UNKNOWN_MODEL)
+        self.price = price
+        self.year = year
+        self.hand = hand
+        self.marketing_text = marketing_text or ""
+        self.agency = sys.intern(agency or PRIVATE_SELLER)
+        self.link = link or ""
+        self.image_url = image_url or ""
+        # Epoch seconds
+        self.found_at = time.time() if found_at is None else found_at
+        self.known = known
+        # Market dict attached by MarketScorer for new cars
+        self.market = market
+        self.km = self.test_date = self.location = self.description = None
+
+    @classmethod
+    def parse(cls, car_id, model, price, year, hand, marketing_text="", agency="", link="", image_url="",
+              found_at=None):
+        """Build a listing from yad2 text ('₪ 75,000', '2019', 'יד 2') or already numeric values"""
+        return cls(car_id, model=model, price=parse_price(price), year=parse_year(year), hand=parse_hand(hand),
+                   marketing_text=marketing_text, agency=agency, link=link, image_url=image_url, found_at=found_at)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a listing from to_dict() output (or an older string-valued car dict)"""
+        found_at = data.get('found_at')
+        if isinstance(found_at, str):
+            try:
+                found_at = datetime.fromisoformat(found_at).timestamp()
+            except ValueError:
+                found_at = None
+        listing = cls.parse(data['id'], data.get('model'), data.get('price'), data.get('year'),
+                            data.get('hand', data.get('yad')), data.get('marketing_text'), data.get('agency'),
+                            data.get('link'), data.get('image_url'), found_at)
+        listing.known = bool(data.get('known'))
+        listing.market = data.get('market')
+        listing.apply_details(data)
+        return listing
+
+    def apply_details(self, details):
+        """Copy item-page fields (km, test_date, location, description) from a dict"""
+        self.km = parse_km(details.get('km'))
+        for name in ('test_date', 'location', 'description'):
+            setattr(self, name, details.get(name) or None)
+
+    def to_dict(self):
+        """JSON-ready dict of the raw fields"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @property
+    def price_text(self):
+        return f"{self.price:,} ₪" if self.price else "Price not found"
+
+    @property
+    def yad(self):
+        """Hand as yad2 shows it ('יד 2'), or ''"""
+        return f"יד {self.hand}" if self.hand else ""
+
+    @property
+    def is_private(self):
+        return self.agency == PRIVATE_SELLER
+
+    @property
+    def km_text(self):
+        return f"{self.km:,} km" if self.km is not None else ""
+
+    def __repr__(self):
+        if self.known:
+            return f"Listing({self.id!r}, known=True)"
+        return f"Listing({self.id!r}, {self.model!r}, price={self.price}, year={self.year}, hand={self.hand})"
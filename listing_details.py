@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Listing detail cache
+Item-page details (mileage, test date, location, description) keyed by listing ID, so an
+item page is fetched at most once per TTL no matter how many profiles or runs see the car
+"""
+
+import json
+import os
+import threading
+import time
+
+SECONDS_PER_DAY = 86400
+
+
+class DetailCache:
+    """JSON file of listing ID -> {'fetched_at', 'details'}, with entries expiring after ttl_days"""
+
+    def __init__(self, path, ttl_days=14):
+        self.path = os.path.expanduser(path)
+        self.ttl_days = ttl_days
+        self._entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _expired(self, entry, now):
+        return bool(self.ttl_days) and now - entry.get('fetched_at', 0) > self.ttl_days * SECONDS_PER_DAY
+
+    def load(self):
+        """Read the cache file, treating a missing or corrupt file as empty and dropping expired entries"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        now = time.time()
+        with self._lock:
+            self._entries = {car_id: entry for car_id, entry in entries.items()
+                             if isinstance(entry, dict) and not self._expired(entry, now)}
+            self._dirty = len(self._entries) != len(entries)
+        return self
+
+    def get(self, car_id, now=None):
+        """Cached details for a listing, or None if it was never fetched or has expired"""
+        with self._lock:
+            entry = self._entries.get(car_id)
+            if entry is None or self._expired(entry, now or time.time()):
+                return None
+            return entry['details']
+
+    def put(self, car_id, details, now=None):
+        """Remember a listing's parsed details"""
+        with self._lock:
+            self._entries[car_id] = {'fetched_at': now or time.time(), 'details': details}
+            self._dirty = True
+
+    def save(self):
+        """Atomically rewrite the cache file if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
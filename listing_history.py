@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Columnar listing history
+Every listing the scraper observes is kept as one row of parsed columns (price, year, hand,
+model, first/last seen) in a compressed NumPy file, so market statistics can be computed
+in bulk over the whole history
+"""
+
+import os
+import threading
+import time
+
+# Column name -> NumPy dtype; strings widen automatically as longer values are appended
+COLUMNS = {
+    'id': 'U16',
+    'model': 'U32',
+    'price': 'int64',
+    'year': 'int32',
+    'hand': 'int16',
+    'first_seen': 'float64',
+    'last_seen': 'float64',
+}
+
+SECONDS_PER_DAY = 86400
+
+
+def normalize_model(model):
+    """Comparable model key: collapse whitespace and case"""
+    return " ".join((model or "").split()).lower()
+
+
+class ListingHistory:
+    """Append/update listing rows in memory and persist them as columns (thread-safe)"""
+
+    def __init__(self, path='listing_history.npz', retention_days=365, touch_resolution_seconds=SECONDS_PER_DAY):
+        self.path = path
+        self.retention_days = retention_days
+        # last_seen only moves in steps of this size, so runs with nothing new leave the file untouched
+        self.touch_resolution_seconds = touch_resolution_seconds
+        self._dirty = False
+        self._columns = None
+        # car_id -> row in self._columns
+        self._index = {}
+        # Rows observed since the last flush, appended as one block on demand
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index) + len(self._pending)
+
+    def __contains__(self, car_id):
+        with self._lock:
+            return car_id in self._index or car_id in self._pending
+
+    def load(self):
+        """Load the column file, starting empty if it does not exist yet"""
+        import numpy as np
+
+        columns = None
+        if os.path.exists(self.path):
+            try:
+                with np.load(self.path) as data:
+                    columns = {name: data[name] for name in COLUMNS}
+            except (OSError, ValueError, KeyError, EOFError) as e:
+                print(f"⚠️ Could not read {self.path}, starting a new history: {e}")
+        if columns is None:
+            columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._columns = columns
+        self._index = {car_id: row for row, car_id in enumerate(columns['id'].tolist())}
+        self._pending = {}
+        self._dirty = False
+        return self
+
+    def observe(self, car, now=None):
+        """Record a fully extracted Listing, updating price/year/hand if it is already known"""
+        now = now or time.time()
+        price = car.price or 0
+        year = car.year or 0
+        hand = car.hand or 0
+        with self._lock:
+            row = self._index.get(car.id)
+            if row is not None:
+                columns = self._columns
+                for name, value in (('price', price), ('year', year), ('hand', hand)):
+                    if value and columns[name][row] != value:
+                        columns[name][row] = value
+                        self._dirty = True
+                self._touch_row(row, now)
+                return
+            pending = self._pending.get(car.id)
+            first_seen = pending['first_seen'] if pending else now
+            self._pending[car.id] = {
+                'id': car.id,
+                'model': normalize_model(car.model),
+                'price': price,
+                'year': year,
+                'hand': hand,
+                'first_seen': first_seen,
+                'last_seen': now,
+            }
+            self._dirty = True
+
+    def touch(self, car_id, now=None):
+        """Refresh last_seen for a listing that is still on the page but was not re-extracted"""
+        now = now or time.time()
+        with self._lock:
+            row = self._index.get(car_id)
+            if row is not None:
+                self._touch_row(row, now)
+            elif car_id in self._pending:
+                self._pending[car_id]['last_seen'] = now
+
+    def _touch_row(self, row, now):
+        """Advance a stored row's last_seen once it is a full resolution step behind (caller holds the lock)"""
+        if now - self._columns['last_seen'][row] >= self.touch_resolution_seconds:
+            self._columns['last_seen'][row] = now
+            self._dirty = True
+
+    def _flush(self):
+        """Append pending rows to the columns (caller holds the lock)"""
+        if not self._pending:
+            return
+        import numpy as np
+
+        rows = list(self._pending.values())
+        offset = len(self._index)
+        for name, dtype in COLUMNS.items():
+            values = [row[name] for row in rows]
+            new_column = np.array(values) if dtype.startswith('U') else np.array(values, dtype=dtype)
+            self._columns[name] = np.concatenate([self._columns[name], new_column])
+        for i, row in enumerate(rows):
+            self._index[row['id']] = offset + i
+        self._pending = {}
+
+    def merge(self, path):
+        """Fold another history file (e.g. a shard worker's) into this one; returns the number of new rows.
+
+        Rows are unioned by ID, keeping the earliest first_seen and the latest last_seen, with
+        price/year/hand taken from whichever copy was seen last.
+        """
+        import numpy as np
+
+        with np.load(path) as data:
+            other = {name: data[name] for name in COLUMNS}
+        added = 0
+        with self._lock:
+            self._flush()
+            columns = self._columns
+            for i, car_id in enumerate(other['id'].tolist()):
+                row = self._index.get(car_id)
+                if row is None:
+                    self._pending[car_id] = {name: other[name][i].item() for name in COLUMNS}
+                    added += 1
+                    continue
+                if other['last_seen'][i] > columns['last_seen'][row]:
+                    for name in ('price', 'year', 'hand', 'last_seen'):
+                        columns[name][row] = other[name][i]
+                    self._dirty = True
+                if other['first_seen'][i] < columns['first_seen'][row]:
+                    columns['first_seen'][row] = other['first_seen'][i]
+                    self._dirty = True
+            if added:
+                self._dirty = True
+        return added
+
+    def columns(self):
+        """Return the history as a dict of equally long NumPy arrays (a snapshot)"""
+        with self._lock:
+            self._flush()
+            return {name: column.copy() for name, column in self._columns.items()}
+
+    def save(self, now=None, path=None):
+        """Drop rows past the retention window and atomically rewrite the column file if anything changed.
+
+        `path` writes the history elsewhere (a shard worker's copy) and leaves self.path untouched.
+        """
+        import numpy as np
+
+        now = now or time.time()
+        path = path or self.path
+        with self._lock:
+            self._flush()
+            columns = self._columns
+            if self.retention_days and len(columns['id']):
+                keep = columns['last_seen'] >= now - self.retention_days * SECONDS_PER_DAY
+                if not keep.all():
+                    columns = {name: column[keep] for name, column in columns.items()}
+                    self._columns = columns
+                    self._index = {car_id: row for row, car_id in enumerate(columns['id'].tolist())}
+                    self._dirty = True
+            if not self._dirty:
+                return
+
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **columns)
+            os.replace(tmp_path, path)
+            self._dirty = False
@@ -4,50 +4,304 @@ Yad2 Car Scraper - Monitors yad2.co.il for new car listings
 Sends WhatsApp notifications when new cars matching your criteria are found
 """
 
-import json
 import time
+
+# Recorded before any other import so --profile-startup can report module load time
+MODULE_LOAD_START = time.perf_counter()
+
+import argparse
+import glob
+import html
+import importlib
+import json
 import os
+import sys
+import threading
 
-import requests
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
+# Heavy dependencies (selenium, webdriver_manager, twilio, requests, email.mime, smtplib, bs4)
+# are imported where they are first used so short runs don't pay for paths they never take
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from twilio.rest import Client
 from yad2_mappings import (
     get_model_codes, get_engine_code, get_gearbox_code, 
-    format_price_range, format_km_range, format_year_range
+    format_price_range, format_km_range, format_year_range, format_image_url
 )
+from feed_parser import (build_known_listing, build_link, build_listing, listing_id, parse_embedded_feed,
+                         parse_feed_html, parse_item_details, split_year_and_yad)
+from listing import PRIVATE_SELLER, UNKNOWN_MODEL, Listing
+from seen_store import DEFAULT_NAMESPACE, SeenStore
+from seen_journal import JournalSeenStore, import_sqlite, merge_deltas
+from driver_cache import DriverCache
+from driver_pool import DriverPool
+from listing_history import ListingHistory
+from listing_details import DetailCache
+from market_scorer import MarketScorer, describe_market
+from notification_dispatcher import NotificationDispatcher, PermanentDeliveryError, merge_outbox
+from run_metrics import RunMetrics
+from query_planner import plan_queries, shard_plan
 from config import CONFIG
 
+MODULE_LOADED_AT = time.perf_counter()
+
+# Dependencies deferred to first use, reported by --profile-startup
+LAZY_DEPENDENCIES = [
+    ("requests", "requests"),
+    ("selenium", "selenium.webdriver"),
+    ("webdriver-manager", "webdriver_manager.chrome"),
+    ("twilio", "twilio.rest"),
+    ("email MIME", "email.mime.multipart"),
+    ("smtplib", "smtp_transport"),
+    ("beautifulsoup4", "bs4"),
+    ("numpy", "numpy"),
+]
+
+# Cards count from 'interactive' on (the eager page-load strategy returns then); 0 is only
+# reported once the page is 'complete', before that it is -1 (not ready) so an empty results
+# page can still become ready without mistaking a half-parsed page for one
+FEED_COUNT_SCRIPT = """
+const state = document.readyState;
+const count = state === 'loading' ? 0 : document.querySelectorAll('[data-nagish="feed-item-base-link"]').length;
+return count > 0 ? count : (state === 'complete' ? 0 : -1);
+"""
+
+# Phase one of two-phase extraction: every card's href in one round trip
+FEED_IDS_SCRIPT = """
+return Array.from(document.querySelectorAll('[data-nagish="feed-item-base-link"]'), card => card.getAttribute('href') || '');
+"""
+
+# Reads feed cards in one round trip; mirrors the selectors used by extract_car_data.
+# An optional list of card indices (arguments[0]) limits it to those cards, null for missing ones
+FEED_EXTRACTION_SCRIPT = """
+const text = (root, selector) => {
+    const el = root ? root.querySelector(selector) : null;
+    return el ? (el.innerText || '').trim() : '';
+};
+const cards = Array.from(document.querySelectorAll('[data-nagish="feed-item-base-link"]'));
+const wanted = arguments.length && arguments[0] ? arguments[0].map(i => cards[i]) : cards;
+return wanted.map(card => {
+    if (!card) return null;
+    const image = card.querySelector('[data-nagish="feed-item-main-image"]');
+    return {
+        model: text(card, '.feed-item-info_heading__k5pVC'),
+        marketing_text: text(card, '.feed-item-info_marketingText__eNE4R'),
+        year_and_yad: text(card, '.feed-item-info_yearAndHandBox___JLbc'),
+        price: text(card.querySelector('[data-testid="private-item-left-side"]'), '.price_price__xQt90'),
+        agency: text(card, '.commercial-item-left-side_agencyName__psfbp')
+            || text(card, '.ultra-plus-item-left-side_agencyName__0Aand'),
+        href: card.href || card.getAttribute('href') || '',
+        image_url: image ? (image.src || image.getAttribute('data-src') || '') : ''
+    };
+});
+"""
+
+# Markers of the bot-protection interstitial served instead of the results page
+BLOCKED_PAGE_MARKERS = ("captcha", "perfdrive", "shieldsquare", "are you for real")
+
 class Yad2CarScraper:
     def __init__(self):
         self.config = CONFIG
-        self.seen_cars = self.load_seen_cars()
+        self.http_session = None
+        self.http_session_lock = threading.Lock()
+        self.smtp_transport = None
+        self.smtp_transport_lock = threading.Lock()
+        # Seen-stores are loaded per search profile namespace on first use
+        self.seen_stores = {}
+        self.seen_stores_lock = threading.Lock()
+        # The Twilio client is only built when a WhatsApp message is actually sent
         self.twilio_client = None
-        self.setup_twilio()
+        self.twilio_setup_done = False
+        # Per-stage timings and counters; scrape_cars starts a fresh set for every run
+        self.metrics = RunMetrics()
+        # Every observed listing, shared by all profiles and loaded on first use
+        self.listing_history = None
+        self.listing_history_lock = threading.Lock()
+        # Item-page details per listing ID, loaded on first use when detail enrichment is on
+        self.detail_cache = None
+        self.detail_cache_lock = threading.Lock()
+        # Background delivery of queued notifications, started on the first notification
+        self.dispatcher = None
+        self.dispatcher_lock = threading.Lock()
+        # (index, count) when running as one of several shard workers; state changes go to delta_dir
+        self.shard = None
+        self.delta_dir = None
+        self.digest_delta_lock = threading.Lock()
+    
+    def configure_shard(self, index, count, delta_dir):
+        """Run as worker `index` of `count`: only this shard's searches, with state written to delta_dir"""
+        if not 0 <= index < count:
+            raise ValueError(f"Shard index {index} is not in 0..{count - 1}")
+        self.shard = (index, count)
+        self.delta_dir = delta_dir
+        os.makedirs(delta_dir, exist_ok=True)
+    
+    def shard_path(self, kind):
+        """This worker's delta file of a kind ('seen.jsonl', 'digests.jsonl', ...), or None when not sharded"""
+        if self.shard is None:
+            return None
+        return os.path.join(self.delta_dir, f"shard-{self.shard[0]}.{kind}")
+    
+    def load_seen_cars(self, namespace=DEFAULT_NAMESPACE):
+        """Load previously seen cars into the indexed seen-store (migrates seen_cars.json / seen_cars.db)"""
+        store_config = self.config.get('seen_store', {})
+        store_args = dict(
+            path=store_config.get('path', 'seen_cars.db'),
+            legacy_json_path=store_config.get('legacy_json_path', 'seen_cars.json'),
+            ttl_days=store_config.get('ttl_days', 90),
+            max_entries=store_config.get('max_entries', 5000),
+            namespace=namespace
+        )
+        # Shard workers always journal, so their changes can be merged as a set union
+        if store_config.get('backend', 'sqlite') == 'journal' or self.shard is not None:
+            return JournalSeenStore(
+                journal_dir=store_config.get('journal_dir', 'seen_state'),
+                compact_after_entries=store_config.get('compact_after_entries', 1000),
+                touch_resolution_days=store_config.get('touch_resolution_days', 7),
+                delta_path=self.shard_path('seen.jsonl'),
+                **store_args
+            ).load()
+        return SeenStore(**store_args).load()
+    
+    def save_seen_cars(self, namespace=DEFAULT_NAMESPACE):
+        """Persist seen-store changes and evict expired entries"""
+        self.get_seen_store(namespace).save()
+    
+    def get_listing_history(self):
+        """Return the listing history (loaded on first use), or None when it is disabled"""
+        history_config = self.config.get('listing_history', {})
+        if not history_config.get('enabled', False):
+            return None
+        with self.listing_history_lock:
+            if self.listing_history is None:
+                try:
+                    self.listing_history = ListingHistory(
+                        path=history_config.get('path', 'listing_history.npz'),
+                        retention_days=history_config.get('retention_days', 365)
+                    ).load()
+                    delta_path = self.shard_path('history.npz')
+                    if delta_path and os.path.exists(delta_path):
+                        # An earlier run of this shard that has not been merged yet
+                        self.listing_history.merge(delta_path)
+                except ImportError as e:
+                    print(f"⚠️ Listing history needs numpy ({e}) - market scoring disabled")
+                    self.config['listing_history'] = dict(history_config, enabled=False)
+                    return None
+            return self.listing_history
     
-    def load_seen_cars(self):
-        """Load previously seen cars from seen_cars.json"""
+    def save_listing_history(self):
+        """Persist the listing history if it was used this run"""
+        if self.listing_history is None:
+            return
+        try:
+            self.listing_history.save(path=self.shard_path('history.npz'))
+        except OSError as e:
+            print(f"⚠️ Could not save listing history: {e}")
+    
+    def get_detail_cache(self):
+        """Return the listing detail cache, loading it on first use"""
+        settings = self.config['scraping_settings'].get('detail_enrichment', {})
+        with self.detail_cache_lock:
+            if self.detail_cache is None:
+                self.detail_cache = DetailCache(
+                    settings.get('cache_path', '~/.cache/yad2-scraper/listing_details.json'),
+                    ttl_days=settings.get('cache_ttl_days', 14)
+                ).load()
+            return self.detail_cache
+    
+    def save_detail_cache(self):
+        """Persist newly fetched listing details"""
+        if self.detail_cache is None:
+            return
+        try:
+            self.detail_cache.save()
+        except OSError as e:
+            print(f"⚠️ Could not save the listing detail cache: {e}")
+    
+    def enrich_new_cars(self, new_cars, label=""):
+        """Fill in mileage, test date, location and description from each new car's item page.
+        
+        Details are cached per listing ID, so a page is fetched at most once per cache TTL.
+        Uncached pages are fetched concurrently (at most `concurrency` at a time) over the
+        pooled HTTP session; cars whose page fails or misses the deadline stay unenriched.
+        """
+        settings = self.config['scraping_settings'].get('detail_enrichment', {})
+        if not settings.get('enabled', False) or not new_cars:
+            return
+        concurrency = settings.get('concurrency', 4)
+        deadline = settings.get('deadline_seconds', 30)
+        timeout = self.config['scraping_settings'].get('http_timeout_seconds', 15)
+        
+        cache = self.get_detail_cache()
+        pending = []
+        for car in new_cars:
+            details = cache.get(car.id)
+            if details is not None:
+                car.apply_details(details)
+                self.metrics.incr('details_cached')
+            elif car.link:
+                pending.append(car)
+        if not pending:
+            return
+        
+        def fetch(car):
+            with self.metrics.span('detail_fetch'):
+                response = self.get_http_session().get(car.link, timeout=min(timeout, deadline))
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            if 'charset' not in response.headers.get('Content-Type', '').lower():
+                response.encoding = 'utf-8'
+            details = parse_item_details(response.text, car.id)
+            if details is None:
+                raise RuntimeError("no listing data on the item page")
+            return details
+        
+        enriched = 0
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending))))
         try:
-            with open('seen_cars.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {"seen_car_ids": [], "last_check": None}
+            futures = {executor.submit(fetch, car): car for car in pending}
+            done, not_done = wait(futures, timeout=deadline)
+            for future in done:
+                car = futures[future]
+                try:
+                    details = future.result()
+                except Exception as e:
+                    self.metrics.incr('detail_failures')
+                    print(f"❌ {label}Could not read the item page of {car.id}: {e}")
+                    continue
+                car.apply_details(details)
+                cache.put(car.id, details)
+                enriched += 1
+            if not_done:
+                self.metrics.incr('detail_failures', len(not_done))
+                print(f"⏱️ {label}{len(not_done)} item pages missed the {deadline}s deadline")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.metrics.incr('details_fetched', enriched)
+        print(f"🔎 {label}Read {enriched} of {len(pending)} item pages for mileage and test date")
     
-    def save_seen_cars(self):
-        """Save seen cars to JSON file"""
-        with open('seen_cars.json', 'w', encoding='utf-8') as f:
-            json.dump(self.seen_cars, f, ensure_ascii=False, indent=2)
+    def score_new_cars(self, new_cars):
+        """Attach a 'market' dict (price percentile vs. same model/year, days on market) to each new car"""
+        history = self.get_listing_history()
+        if history is None or not new_cars:
+            return
+        
+        history_config = self.config.get('listing_history', {})
+        with self.metrics.span('market_scoring'):
+            scorer = MarketScorer.from_history(
+                history,
+                min_comparables=history_config.get('min_comparables', 5),
+                below_market_threshold=history_config.get('below_market_threshold', 0.05),
+                exclude_ids={car.id for car in new_cars}
+            )
+            for car, market in zip(new_cars, scorer.score(new_cars)):
+                car.market = market
+        below = sum(1 for car in new_cars if car.market and car.market['below_market'])
+        if below:
+            self.metrics.incr('below_market', below)
+            print(f"🔥 {below} of {len(new_cars)} new cars are priced below market")
     
     def setup_twilio(self):
         """Setup Twilio WhatsApp client"""
+        self.twilio_setup_done = True
         try:
             # Read from config (which gets from environment variables)
             twilio_config = self.config.get('notification_settings', {}).get('twilio', {})
@@ -58,6 +312,7 @@ class Yad2CarScraper:
                 print("⚠️ Twilio credentials not set - WhatsApp notifications disabled")
                 return
             
+            from twilio.rest import Client
             self.twilio_client = Client(account_sid, auth_token)
             print("✅ Twilio WhatsApp client initialized")
         except Exception as e:
@@ -71,13 +326,16 @@ class Yad2CarScraper:
             print("📧 Email notifications disabled")
             return
             
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.image import MIMEImage
+        from smtp_transport import parse_recipients
+        
         try:
             # Email configuration
-            smtp_server = email_config['smtp_server']
-            smtp_port = email_config['smtp_port']
             sender_email = email_config['sender_email']
-            sender_password = email_config['sender_password']  # Use app password for Gmail
-            recipient_email = email_config['recipient_email']
+            recipients = parse_recipients(email_config['recipient_email'])
+            recipient_email = ", ".join(recipients)
             
             # Create message
             msg = MIMEMultipart('related')
@@ -115,20 +373,16 @@ class Yad2CarScraper:
                 
                 msg.attach(MIMEText(html_body, 'html', 'utf-8'))
                 
-                # Download and attach the image
-                try:
-                    print(f"📥 Downloading image: {image_url}")
-                    response = requests.get(image_url, timeout=10)
-                    if response.status_code == 200:
-                        img = MIMEImage(response.content)
-                        img.add_header('Content-ID', '<car_image>')
-                        img.add_header('Content-Disposition', 'inline', filename="car_image.jpg")
-                        msg.attach(img)
-                        print("✅ Image downloaded and embedded")
-                    else:
-                        print(f"❌ Failed to download image: HTTP {response.status_code}")
-                except Exception as img_error:
-                    print(f"❌ Image download failed: {img_error}")
+                # Download and attach the image through the shared pooled fetcher
+                print(f"📥 Downloading image: {image_url}")
+                image_data = self.fetch_images([image_url]).get(image_url)
+                if image_data:
+                    img = MIMEImage(image_data)
+                    img.add_header('Content-ID', '<car_image>')
+                    img.add_header('Content-Disposition', 'inline', filename="car_image.jpg")
+                    msg.attach(img)
+                    print("✅ Image downloaded and embedded")
+                else:
                     # Fallback to text email with link
                     msg = MIMEMultipart()
                     msg['From'] = sender_email
@@ -140,32 +394,53 @@ class Yad2CarScraper:
                 # No image, send plain text
                 msg.attach(MIMEText(message, 'plain', 'utf-8'))
             
-            # Gmail SMTP configuration
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()  # Enable encryption
-            server.login(sender_email, sender_password)
-            
-            # Send email
-            text = msg.as_string()
-            server.sendmail(sender_email, recipient_email, text)
-            server.quit()
+            # Send over the run's shared SMTP connection
+            with self.metrics.span('smtp_send'):
+                self.get_smtp_transport().send(msg, recipients)
             
             print(f"✅ Email sent successfully to {recipient_email}")
             if image_url:
                 print(f"📸 Image embedded in email")
             
         except Exception as e:
+            self.metrics.incr('email_failures')
             print(f"❌ Failed to send email: {e}")
             print("💡 Make sure to use an App Password for Gmail, not your regular password")
 
-    def send_comprehensive_email(self, new_cars):
+    def get_smtp_transport(self):
+        """Return the run's shared SMTP transport, created on first use"""
+        with self.smtp_transport_lock:
+            if self.smtp_transport is None:
+                from smtp_transport import SmtpTransport
+                email_config = self.config.get('notification_settings', {}).get('email', {})
+                self.smtp_transport = SmtpTransport(
+                    email_config['smtp_server'],
+                    email_config['smtp_port'],
+                    email_config['sender_email'],
+                    email_config['sender_password'],  # Use app password for Gmail
+                    use_starttls=email_config.get('smtp_starttls', True)
+                )
+            return self.smtp_transport
+    
+    def close_smtp_transport(self):
+        """Close the shared SMTP connection at the end of a run"""
+        if self.smtp_transport is not None:
+            self.smtp_transport.close()
+            self.smtp_transport = None
+    
+    def send_comprehensive_email(self, new_cars, profile=None):
         """Send one email with all new cars using existing email configuration"""
+        profile = profile or {}
+        profile_name = profile.get('name', DEFAULT_NAMESPACE)
+        
         # Create comprehensive email content
         count = len(new_cars)
         if count == 1:
-            subject = f"🚗 New Car Alert: {new_cars[0]['model']} - {new_cars[0]['price']}"
+            subject = f"🚗 New Car Alert: {new_cars[0].model} - {new_cars[0].price_text}"
         else:
             subject = f"🚗 {count} New Cars Found on Yad2!"
+        if profile_name != DEFAULT_NAMESPACE:
+            subject = f"[{profile_name}] {subject}"
         
         # Build comprehensive message
         message_parts = [
@@ -178,19 +453,28 @@ class Yad2CarScraper:
         # Add each car
         for i, car in enumerate(new_cars, 1):
             car_details = [f"\n🚗 Car #{i}:"]
-            car_details.append(f"🏷️ {car['model']}")
-            if car['year']:
-                car_details.append(f"📅 {car['year']}")
-            if car['yad']:
-                car_details.append(f"👥 {car['yad']}")
-            car_details.append(f"💰 {car['price']}")
-            if car['agency'] != "private person":
-                car_details.append(f"🏢 {car['agency']}")
+            car_details.append(f"🏷️ {car.model}")
+            if car.year:
+                car_details.append(f"📅 {car.year}")
+            if car.hand:
+                car_details.append(f"👥 {car.yad}")
+            car_details.append(f"💰 {car.price_text}")
+            if car.km is not None:
+                car_details.append(f"🛣️ {car.km_text}")
+            if car.test_date:
+                car_details.append(f"🔧 Test until {car.test_date}")
+            if car.location:
+                car_details.append(f"📍 {car.location}")
+            if not car.is_private:
+                car_details.append(f"🏢 {car.agency}")
             else:
                 car_details.append("👤 Private Person")
-            if car['marketing_text']:
-                car_details.append(f"ℹ️ {car['marketing_text']}")
-            car_details.append(f"🔗 Link to ad: {car['link']}")
+            if car.marketing_text:
+                car_details.append(f"ℹ️ {car.marketing_text}")
+            market_text = describe_market(car.market)
+            if market_text:
+                car_details.append(market_text)
+            car_details.append(f"🔗 Link to ad: {car.link}")
             car_details.append("-" * 30)
             
             message_parts.extend(car_details)
@@ -203,10 +487,15 @@ class Yad2CarScraper:
         
         comprehensive_message = "\n".join(message_parts)
         
-        # Use existing send_email method with special handling for multiple images
-        self._send_email_with_multiple_images(subject, comprehensive_message, new_cars)
+        # Queue the digest; images are downloaded and the email is sent in the background
+        self.notify('email', {
+            'subject': subject,
+            'message': comprehensive_message,
+            'cars': [car.to_dict() for car in new_cars],
+            'recipient_email': profile.get('recipient_email'),
+        })
 
-    def _send_email_with_multiple_images(self, subject, message, new_cars):
+    def _send_email_with_multiple_images(self, subject, message, new_cars, recipient_email=None, raise_errors=False):
         """Helper method to send email with multiple car images"""
         email_config = self.config.get('notification_settings', {}).get('email', {})
         
@@ -214,16 +503,38 @@ class Yad2CarScraper:
             print("📧 Email notifications disabled")
             return
             
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.image import MIMEImage
+        from smtp_transport import parse_recipients
+        
         try:
             # Use existing email configuration from config
-            smtp_server = email_config['smtp_server']
-            smtp_port = email_config['smtp_port']
             sender_email = email_config['sender_email']
-            sender_password = email_config['sender_password']
-            recipient_email = email_config['recipient_email']
+            # Profiles may route their digest to a different recipient
+            recipients = parse_recipients(recipient_email or email_config['recipient_email'])
+            recipient_email = ", ".join(recipients)
+            
+            # Download all images concurrently; anything that misses the deadline becomes a plain link
+            print(f"📥 Downloading {sum(1 for car in new_cars if car.image_url)} images")
+            images = self.fetch_images([car.image_url for car in new_cars if car.image_url])
+            # Embed images in digest order until the per-email byte budget is spent; the rest are linked
+            max_email_image_bytes = email_config.get('max_email_image_bytes', 2_000_000)
+            embedded_images = set()
+            embedded_bytes = 0
+            for i, car in enumerate(new_cars, 1):
+                image_data = images.get(car.image_url)
+                if not image_data:
+                    continue
+                if max_email_image_bytes and embedded_bytes + len(image_data) > max_email_image_bytes:
+                    continue
+                embedded_images.add(i)
+                embedded_bytes += len(image_data)
+            if len(embedded_images) < len(images):
+                print(f"📦 Image budget reached - linking {len(images) - len(embedded_images)} images instead")
             
             # Create HTML version for better formatting
-            html_body = self._create_html_email_body(message, new_cars)
+            html_body = self._create_html_email_body(message, new_cars, embedded_images)
             
             # Create message
             msg = MIMEMultipart('related')
@@ -232,40 +543,36 @@ class Yad2CarScraper:
             msg['Subject'] = subject
             msg.attach(MIMEText(html_body, 'html', 'utf-8'))
             
-            # Download and attach all images
+            # Attach the downloaded images
             images_attached = 0
             for i, car in enumerate(new_cars, 1):
-                if car.get('image_url'):
-                    try:
-                        print(f"📥 Downloading image {i}/{len(new_cars)}: {car['image_url']}")
-                        response = requests.get(car['image_url'], timeout=10)
-                        if response.status_code == 200:
-                            img = MIMEImage(response.content)
-                            img.add_header('Content-ID', f'<car_image_{i}>')
-                            img.add_header('Content-Disposition', 'inline', filename=f"car_{i}.jpg")
-                            msg.attach(img)
-                            images_attached += 1
-                        else:
-                            print(f"❌ Failed to download image {i}: HTTP {response.status_code}")
-                    except Exception as img_error:
-                        print(f"❌ Image {i} download failed: {img_error}")
-            
-            # Send email using existing SMTP logic
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipient_email, msg.as_string())
-            server.quit()
+                if i in embedded_images:
+                    img = MIMEImage(images[car.image_url])
+                    img.add_header('Content-ID', f'<car_image_{i}>')
+                    img.add_header('Content-Disposition', 'inline', filename=f"car_{i}.jpg")
+                    msg.attach(img)
+                    images_attached += 1
+            
+            # Send over the run's shared SMTP connection
+            with self.metrics.span('smtp_send'):
+                self.get_smtp_transport().send(msg, recipients)
             
             print(f"✅ Email sent successfully to {recipient_email}")
-            print(f"📧 Email contains: {len(new_cars)} cars, {images_attached} images")
+            print(f"📧 Email contains: {len(new_cars)} cars, {images_attached} images ({embedded_bytes // 1024} KB)")
             
         except Exception as e:
+            self.metrics.incr('email_failures')
             print(f"❌ Failed to send email: {e}")
             print("💡 Make sure to use an App Password for Gmail, not your regular password")
+            if raise_errors:
+                raise
 
-    def _create_html_email_body(self, message, new_cars):
-        """Create beautiful HTML email body"""
+    def _create_html_email_body(self, message, new_cars, embedded_images=None):
+        """Create beautiful HTML email body
+        
+        embedded_images holds the 1-based indexes of cars whose image is attached inline;
+        other cars with an image_url get a link instead. None embeds every image.
+        """
         count = len(new_cars)
         
         html_body = f"""
@@ -279,18 +586,30 @@ class Yad2CarScraper:
         # Add each car
         for i, car in enumerate(new_cars, 1):
             car_details = []
-            car_details.append(f"🏷️ {car['model']}")
-            if car['year']:
-                car_details.append(f"📅 {car['year']}")
-            if car['yad']:
-                car_details.append(f"👥 {car['yad']}")
-            car_details.append(f"💰 {car['price']}")
-            if car['agency'] != "private person":
-                car_details.append(f"🏢 {car['agency']}")
+            car_details.append(f"🏷️ {car.model}")
+            if car.year:
+                car_details.append(f"📅 {car.year}")
+            if car.hand:
+                car_details.append(f"👥 {car.yad}")
+            car_details.append(f"💰 {car.price_text}")
+            if car.km is not None:
+                car_details.append(f"🛣️ {car.km_text}")
+            if car.test_date:
+                car_details.append(f"🔧 Test until {car.test_date}")
+            if car.location:
+                car_details.append(f"📍 {car.location}")
+            if not car.is_private:
+                car_details.append(f"🏢 {car.agency}")
             else:
                 car_details.append("👤 Private Person")
-            if car['marketing_text']:
-                car_details.append(f"ℹ️ {car['marketing_text']}")
+            if car.marketing_text:
+                car_details.append(f"ℹ️ {car.marketing_text}")
+            market_text = describe_market(car.market)
+            if market_text:
+                car_details.append(market_text)
+            if car.description:
+                description = car.description if len(car.description) <= 300 else car.description[:300] + "…"
+                car_details.append(f"📝 {html.escape(description)}")
             
             html_body += f"""
             <div style="border: 2px solid #e0e0e0; border-radius: 10px; padding: 20px; margin: 20px 0; background-color: #f9f9f9;">
@@ -300,17 +619,23 @@ class Yad2CarScraper:
                 </div>
                 <br>
                 <div style="margin: 15px 0;">
-                    <strong>🔗 <a href="{car['link']}" target="_blank" style="color: #2c5aa0; text-decoration: none; font-size: 16px;">View this car on Yad2</a></strong>
+                    <strong>🔗 <a href="{car.link}" target="_blank" style="color: #2c5aa0; text-decoration: none; font-size: 16px;">View this car on Yad2</a></strong>
                 </div>
             """
             
             # Add image if available
-            if car.get('image_url'):
+            if car.image_url and (embedded_images is None or i in embedded_images):
                 html_body += f"""
                 <div style="margin: 15px 0;">
                     <img src="cid:car_image_{i}" style="max-width: 100%; height: auto; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
                 </div>
                 """
+            elif car.image_url:
+                html_body += f"""
+                <div style="margin: 15px 0;">
+                    📸 <a href="{car.image_url}" target="_blank" style="color: #2c5aa0;">View car image</a>
+                </div>
+                """
             
             html_body += "</div>"
         
@@ -326,10 +651,72 @@ class Yad2CarScraper:
         
         return html_body
     
-    def send_whatsapp_message(self, message, image_url=None):
+    def fetch_images(self, image_urls):
+        """Download images concurrently over the pooled HTTP session.
+        
+        Each image is requested as a smaller CDN rendition and dropped if it is bigger than
+        the per-image byte budget. Returns {original_url: bytes} for every image fetched
+        before the total deadline; failed, oversized or late images are left out so callers
+        can fall back to a link.
+        """
+        email_config = self.config.get('notification_settings', {}).get('email', {})
+        concurrency = email_config.get('image_fetch_concurrency', 6)
+        deadline = email_config.get('image_fetch_deadline_seconds', 15)
+        image_width = email_config.get('image_width', 640)
+        max_image_bytes = email_config.get('max_image_bytes', 200_000)
+        
+        unique_urls = list(dict.fromkeys(url for url in image_urls if url))
+        if not unique_urls:
+            return {}
+        
+        def fetch(url):
+            with self.metrics.span('image_fetch'):
+                return fetch_sized(url)
+        
+        def fetch_sized(url):
+            sized_url = format_image_url(url, image_width)
+            with self.get_http_session().get(sized_url, timeout=min(10, deadline), stream=True) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                declared_size = int(response.headers.get('Content-Length') or 0)
+                if max_image_bytes and declared_size > max_image_bytes:
+                    raise RuntimeError(f"{declared_size} bytes exceeds the {max_image_bytes}-byte image budget")
+                
+                content = bytearray()
+                for chunk in response.iter_content(chunk_size=16384):
+                    content.extend(chunk)
+                    if max_image_bytes and len(content) > max_image_bytes:
+                        raise RuntimeError(f"image exceeds the {max_image_bytes}-byte image budget")
+                return bytes(content)
+        
+        images = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(unique_urls))))
+        try:
+            futures = {executor.submit(fetch, url): url for url in unique_urls}
+            done, not_done = wait(futures, timeout=deadline)
+            for future in done:
+                url = futures[future]
+                try:
+                    images[url] = future.result()
+                except Exception as img_error:
+                    self.metrics.incr('image_failures')
+                    print(f"❌ Image download failed ({url}): {img_error}")
+            if not_done:
+                self.metrics.incr('image_failures', len(not_done))
+                print(f"⏱️ {len(not_done)} images missed the {deadline}s deadline - linking instead")
+        finally:
+            # Don't wait for stragglers past the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+        return images
+    
+    def send_whatsapp_message(self, message, image_url=None, raise_errors=False):
         """Send WhatsApp message via Twilio with optional image"""
+        if not self.twilio_setup_done:
+            self.setup_twilio()
         if not self.twilio_client:
             print("❌ WhatsApp not configured")
+            if raise_errors:
+                raise PermanentDeliveryError("WhatsApp not configured")
             return
             
         try:
@@ -352,9 +739,125 @@ class Yad2CarScraper:
                 print(f"📸 Image included: {image_url}")
         except Exception as e:
             print(f"❌ Failed to send WhatsApp: {e}")
+            if raise_errors:
+                raise
+    
+    def get_dispatcher(self):
+        """Return the notification dispatcher, starting it (and resuming the outbox) on first use"""
+        with self.dispatcher_lock:
+            if self.dispatcher is None:
+                dispatcher_config = self.config.get('notification_settings', {}).get('dispatcher', {})
+                # A shard worker queues into its own outbox, so it never resumes (and re-sends) the shared one
+                self.dispatcher = NotificationDispatcher(
+                    self.shard_path('outbox.db') or dispatcher_config.get('outbox_path', 'seen_cars.db'),
+                    handlers={
+                        'email': self.deliver_email_job,
+                        'whatsapp': self.deliver_whatsapp_job,
+                    },
+                    min_intervals=dispatcher_config.get('min_interval_seconds', {}),
+                    max_attempts=dispatcher_config.get('max_attempts', 8),
+                    backoff_base_seconds=dispatcher_config.get('backoff_base_seconds', 2),
+                    backoff_max_seconds=dispatcher_config.get('backoff_max_seconds', 300)
+                ).start()
+            return self.dispatcher
+    
+    def notify(self, channel, payload):
+        """Queue a notification for background delivery (or deliver it inline when the dispatcher is off)"""
+        dispatcher_config = self.config.get('notification_settings', {}).get('dispatcher', {})
+        if not dispatcher_config.get('enabled', True):
+            handler = self.deliver_email_job if channel == 'email' else self.deliver_whatsapp_job
+            try:
+                handler(payload)
+            except Exception:
+                pass  # Already reported by the sender
+            return
+        self.get_dispatcher().enqueue(channel, payload)
+    
+    def deliver_email_job(self, payload):
+        """Dispatcher handler: send a queued digest, raising so failures are retried"""
+        cars = [Listing.from_dict(car) for car in payload['cars']]
+        self._send_email_with_multiple_images(payload['subject'], payload['message'], cars,
+                                              recipient_email=payload.get('recipient_email'), raise_errors=True)
+    
+    def deliver_whatsapp_job(self, payload):
+        """Dispatcher handler: send a queued WhatsApp alert, raising so failures are retried"""
+        self.send_whatsapp_message(payload['message'], payload.get('image_url'), raise_errors=True)
+    
+    def drain_notifications(self):
+        """Give queued notifications until drain_timeout_seconds to go out; the rest stay in the outbox"""
+        if self.dispatcher is None:
+            return
+        dispatcher_config = self.config.get('notification_settings', {}).get('dispatcher', {})
+        remaining = self.dispatcher.drain(dispatcher_config.get('drain_timeout_seconds', 120))
+        if remaining:
+            print(f"📬 {remaining} notifications are waiting for a retry and stay in the outbox")
+    
+    def stop_notifications(self):
+        """Shut down the dispatcher's channel workers; undelivered jobs stay in the outbox"""
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+            self.dispatcher = None
+    
+    def get_http_session(self):
+        """Return a pooled requests session with browser-like headers, created on first use"""
+        with self.http_session_lock:
+            if self.http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'User-Agent': "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+                                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+                    'Accept': "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                    'Accept-Language': "he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7",
+                })
+                self.http_session = session
+            return self.http_session
+    
+    def fetch_cars_http(self, search_url):
+        """Fetch the search page without a browser and read listings from its embedded JSON state.
+        
+        Returns [] for a results page with no listings (past the last page) and None when the page
+        has to be loaded in the browser instead (blocked, failed or without feed state).
+        """
+        timeout = self.config['scraping_settings'].get('http_timeout_seconds', 15)
+        try:
+            with self.metrics.span('http_fetch'):
+                response = self.get_http_session().get(search_url, timeout=timeout)
+            if response.status_code != 200:
+                print(f"🚫 HTTP fetch blocked or failed: HTTP {response.status_code}")
+                return None
+            
+            # Yad2 pages are UTF-8; don't let requests fall back to ISO-8859-1 when the charset is omitted
+            if 'charset' not in response.headers.get('Content-Type', '').lower():
+                response.encoding = 'utf-8'
+            
+            page_lower = response.text.lower()
+            if any(marker in page_lower for marker in BLOCKED_PAGE_MARKERS) and '__next_data__' not in page_lower:
+                print("🚫 HTTP fetch hit the bot-protection page")
+                return None
+            
+            cars = parse_embedded_feed(response.text)
+            if cars is None:
+                print("🔍 HTTP response has no feed state")
+            else:
+                print(f"⚡ Fetched {len(cars)} listings over HTTP (no browser needed)")
+            return cars
+        except Exception as e:
+            print(f"❌ HTTP fetch failed: {e}")
+            return None
     
     def setup_driver(self):
         """Setup Chrome WebDriver with options"""
+        startup_start = time.monotonic()
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        
         chrome_options = Options()
         chrome_options.add_argument("--headless")  # Run in background
         chrome_options.add_argument("--no-sandbox")
@@ -366,6 +869,52 @@ class Yad2CarScraper:
         # Add user agent to look more human
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36")
         
+        # Lean mode: only the feed DOM matters, so skip images and don't wait for subresources
+        lean_config = self.config['scraping_settings'].get('lean_browser', {})
+        if lean_config.get('enabled', False):
+            chrome_options.page_load_strategy = 'eager'
+            if lean_config.get('block_images', True):
+                chrome_options.add_experimental_option(
+                    "prefs", {"profile.managed_default_content_settings.images": 2}
+                )
+        
+        # Reuse a verified chromedriver for this Chrome version; only ask webdriver-manager on a mismatch
+        cache_path = self.config['scraping_settings'].get('driver_cache_path', '~/.cache/yad2-scraper/chromedriver.json')
+        resolve_start = time.monotonic()
+        driver_path, cache_hit = DriverCache(cache_path).resolve(self.install_chromedriver)
+        resolve_seconds = time.monotonic() - resolve_start
+        
+        service = Service(driver_path)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        
+        if lean_config.get('enabled', False):
+            self.block_resources(driver, lean_config)
+        
+        startup_seconds = time.monotonic() - startup_start
+        self.metrics.observe('setup_driver', startup_seconds)
+        print(f"⏱️ Driver started in {startup_seconds:.2f}s (driver resolution {resolve_seconds:.2f}s, "
+              f"{'cache hit' if cache_hit else 'cache miss'})")
+        
+        return driver
+    
+    def block_resources(self, driver, lean_config):
+        """Block fonts, media and third-party hosts through CDP network blocking"""
+        blocked_urls = list(lean_config.get('blocked_url_patterns', []))
+        blocked_urls += [f"*{host}*" for host in lean_config.get('blocked_hosts', [])]
+        if not blocked_urls:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+            print(f"🚫 Blocking {len(blocked_urls)} resource patterns")
+        except Exception as e:
+            print(f"⚠️ Could not enable resource blocking: {e}")
+    
+    def install_chromedriver(self):
+        """Install chromedriver through webdriver-manager and return a usable binary path"""
+        from webdriver_manager.chrome import ChromeDriverManager
+        
         driver_path = ChromeDriverManager().install()
         
         # OS-agnostic fix for webdriver-manager pointing to wrong file
@@ -388,18 +937,57 @@ class Yad2CarScraper:
         except Exception as e:
             print(f"⚠️ Could not set execute permissions: {e}")
         
-        service = Service(driver_path)
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver_path
+    
+    def wait_for_feed(self, driver):
+        """Wait until the feed card count stops changing.
         
-        return driver
+        Cards are counted as soon as the DOM is interactive. A count that stays at 0 once the
+        page has fully loaded is a results page with no listings (a search with no matches, or
+        past the last page) and is ready as well. Returns the number of seconds the wait took;
+        gives up at the configured ceiling.
+        """
+        settings = self.config['scraping_settings']
+        timeout = settings.get('feed_wait_timeout_seconds', 20)
+        poll_interval = settings.get('feed_poll_interval_seconds', 0.25)
+        stable_polls_needed = settings.get('feed_stable_polls', 3)
+        
+        start = time.monotonic()
+        last_count = -1
+        stable_polls = 0
+        count = -1
+        while True:
+            try:
+                count = driver.execute_script(FEED_COUNT_SCRIPT)
+                count = -1 if count is None else count
+            except Exception as e:
+                print(f"⚠️ Feed readiness check failed: {e}")
+                count = -1
+            
+            if count >= 0 and count == last_count:
+                stable_polls += 1
+            else:
+                stable_polls = 0
+            last_count = count
+            
+            elapsed = time.monotonic() - start
+            if stable_polls >= stable_polls_needed:
+                print(f"⏱️ Feed ready with {count} listings after {elapsed:.2f}s")
+                return elapsed
+            if elapsed >= timeout:
+                if count > 0:
+                    print(f"⚠️ Feed still changing after {elapsed:.2f}s - continuing with {count} listings")
+                else:
+                    print(f"⚠️ Feed did not render within {timeout}s")
+                return elapsed
+            time.sleep(poll_interval)
     
-    def build_search_url(self):
+    def build_search_url(self, prefs=None):
         """Build Yad2 search URL based on configuration with proper parameter mapping"""
         base_url = "https://www.yad2.co.il/vehicles/cars"
         params = []
         
-        prefs = self.config['car_preferences']
+        prefs = prefs or self.config['car_preferences']
         
         # Models - convert to yad2 model codes
         if prefs.get('models'):
@@ -457,6 +1045,8 @@ class Yad2CarScraper:
     
     def extract_car_data(self, car_element):
         """Extract car data from a listing element based on real yad2 HTML structure"""
+        from selenium.webdriver.common.by import By
+        
         try:
             # Helper function for retrying element extraction - minimal since content is pre-loaded
             def retry_extract(description, extraction_func, retries=1, delay=0.1):
@@ -490,15 +1080,7 @@ class Yad2CarScraper:
             # Extract year and hand info with retry
             def extract_year_yad():
                 year_and_yad_elem = car_element.find_element(By.CSS_SELECTOR, '.feed-item-info_yearAndHandBox___JLbc')
-                text = year_and_yad_elem.text.strip()
-                if text:
-                    parts = text.split('•')
-                    parts = [part.strip() for part in parts]
-                    return {
-                        'year': parts[0] if len(parts) > 0 else "",
-                        'yad': parts[1] if len(parts) > 1 else ""
-                    }
-                return None
+                return split_year_and_yad(year_and_yad_elem.text)
             
             year_yad_data = retry_extract("year/yad", extract_year_yad) or {}
             year = year_yad_data.get('year', "")
@@ -511,20 +1093,11 @@ class Yad2CarScraper:
                 text = price_elem.text.strip()
                 return text if text else None
             
-            price_text = retry_extract("price", extract_price) or "Price not found"
+            price_text = retry_extract("price", extract_price)
             
             # Extract link with retry
             def extract_link():
-                href = car_element.get_attribute('href')
-                if href:
-                    # Build full URL from relative href
-                    if href.startswith('item/'):
-                        return f"https://www.yad2.co.il/{href}"
-                    elif href.startswith('http'):
-                        return href  # Already full URL
-                    else:
-                        return f"https://www.yad2.co.il/{href}"
-                return None
+                return build_link(car_element.get_attribute('href'))
             
             link = retry_extract("link", extract_link) or ""
             
@@ -550,7 +1123,7 @@ class Yad2CarScraper:
                 
                 return None
             
-            agency = retry_extract("agency", extract_agency) or "private person"
+            agency = retry_extract("agency", extract_agency) or PRIVATE_SELLER
             
             # Extract image URL with retry
             def extract_image():
@@ -563,42 +1136,7 @@ class Yad2CarScraper:
             
             image_url = retry_extract("image", extract_image) or ""
             
-            # Create comprehensive title
-            title_parts = [model]
-            if year:
-                title_parts.append(year)
-            if yad:
-                title_parts.append(yad)
-            if marketing_text and len(marketing_text) < 80:  # Only add if short
-                title_parts.append(marketing_text)
-            
-            full_title = " - ".join(filter(None, title_parts))
-            
-            # Generate unique ID from link
-            if link and 'item/' in link:
-                # Extract car ID from URL like: https://www.yad2.co.il/item/kdqeegdr?...
-                # Get the part after 'item/' and before any query parameters
-                item_part = link.split('item/')[-1]
-                car_id = item_part.split('?')[0]  # Remove query parameters
-            else:
-                # Fallback: use element text content hash
-                import hashlib
-                content = f"{model}_{price_text}_{year}_{yad}_{marketing_text}_{agency}"
-                car_id = hashlib.md5(content.encode()).hexdigest()[:8]
-            
-            return {
-                'id': car_id,
-                'title': full_title,
-                'model': model,
-                'price': price_text,
-                'year': year,
-                'yad': yad,
-                'marketing_text': marketing_text,
-                'agency': agency,
-                'link': link,
-                'image_url': image_url,
-                'found_at': datetime.now().isoformat()
-            }
+            return build_listing(model, price_text, year, yad, marketing_text, agency, link, image_url)
             
         except Exception as e:
             print(f"❌ Error extracting car data: {e}")
@@ -610,95 +1148,617 @@ class Yad2CarScraper:
             return None
         
     
-    def scrape_cars(self):
-        """Main scraping function"""
+    def extract_all_cars(self, driver, indices=None):
+        """Extract every feed card (or only the cards at `indices`) in a single execute_script round trip"""
+        try:
+            if indices is None:
+                raw_cars = driver.execute_script(FEED_EXTRACTION_SCRIPT) or []
+            else:
+                raw_cars = driver.execute_script(FEED_EXTRACTION_SCRIPT, list(indices)) or []
+        except Exception as e:
+            print(f"❌ Batch extraction failed: {e}")
+            return None
+        
+        cars = []
+        for raw in raw_cars:
+            if not raw:
+                # The card disappeared between the two phases
+                cars.append(None)
+                continue
+            year_yad_data = split_year_and_yad(raw.get('year_and_yad')) or {}
+            cars.append(build_listing(
+                model=raw.get('model') or UNKNOWN_MODEL,
+                price=raw.get('price'),
+                year=year_yad_data.get('year', ""),
+                yad=year_yad_data.get('yad', ""),
+                marketing_text=raw.get('marketing_text') or "",
+                agency=raw.get('agency') or PRIVATE_SELLER,
+                link=build_link(raw.get('href')) or "",
+                image_url=raw.get('image_url') or ""
+            ))
+        return cars
+    
+    def read_known_listings(self, driver, known_ids):
+        """Phase one of two-phase extraction: read every card's href and diff the IDs against known_ids.
+        
+        Returns (card_count, {index: placeholder for each known card}, [indices of cards to extract]).
+        """
+        hrefs = driver.execute_script(FEED_IDS_SCRIPT) or []
+        known_cards = {}
+        new_indices = []
+        for index, href in enumerate(hrefs):
+            link = build_link(href)
+            car_id = listing_id(link)
+            if car_id and car_id in known_ids:
+                known_cards[index] = build_known_listing(car_id, link)
+            else:
+                new_indices.append(index)
+        return len(hrefs), known_cards, new_indices
+    
+    def get_search_profiles(self):
+        """Return the configured search profiles, or the single car_preferences block as 'default'"""
+        profiles = self.config.get('search_profiles') or []
+        if not profiles:
+            return [{"name": DEFAULT_NAMESPACE, "car_preferences": self.config['car_preferences']}]
+        return profiles
+    
+    def plan_searches(self, profiles):
+        """Merge the profiles into as few searches as possible (profiles with unknown models are skipped)"""
+        valid_profiles = []
+        for profile in profiles:
+            models = profile.get('car_preferences', {}).get('models')
+            try:
+                if models:
+                    get_model_codes(models)
+            except ValueError as e:
+                self.metrics.incr('profile_failures')
+                print(f"❌ [{profile.get('name', DEFAULT_NAMESPACE)}] Invalid search profile: {e}")
+                continue
+            valid_profiles.append(profile)
+        
+        merge = self.config['scraping_settings'].get('merge_profile_queries', True)
+        plan = plan_queries(valid_profiles, merge=merge)
+        if len(plan) < len(valid_profiles):
+            print(f"🧭 {len(valid_profiles)} search profiles merged into {len(plan)} searches")
+        if self.shard is not None:
+            plan = shard_plan(plan, *self.shard)
+            print(f"🧩 Shard {self.shard[0]}/{self.shard[1]}: running {len(plan)} searches"
+                  + (": " + ", ".join(query.name for query in plan) if plan else ""))
+        self.metrics.incr('search_queries', len(plan))
+        return plan
+    
+    def get_seen_store(self, namespace=DEFAULT_NAMESPACE):
+        """Return the seen-store for a profile namespace, loading it on first use"""
+        with self.seen_stores_lock:
+            if namespace not in self.seen_stores:
+                self.seen_stores[namespace] = self.load_seen_cars(namespace)
+            return self.seen_stores[namespace]
+    
+    def create_driver_pool(self):
+        """Create a browser pool sized for the configured search profiles"""
+        pool_size = self.config['scraping_settings'].get('browser_pool_size', 2)
+        return DriverPool(self.setup_driver, size=min(pool_size, len(self.get_search_profiles())))
+    
+    def scrape_cars(self, driver_pool=None):
+        """Main scraping function - runs every search profile concurrently through a bounded browser pool.
+        
+        A caller-supplied driver_pool (daemon mode) is left open so its browsers stay warm.
+        """
         if not self.config:
             print("❌ No configuration loaded")
             return
         
         print("🔍 ")
         
-        driver = None
+        self.metrics = RunMetrics()
+        plan = self.plan_searches(self.get_search_profiles())
+        owns_pool = driver_pool is None
+        if owns_pool:
+            driver_pool = self.create_driver_pool()
+        
+        try:
+            if len(plan) == 1:
+                self.scrape_query(plan[0], driver_pool)
+            elif plan:
+                print(f"🗂️ Running {len(plan)} searches with up to {driver_pool.size} browsers")
+                with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+                    futures = [executor.submit(self.scrape_query, query, driver_pool) for query in plan]
+                    for future in futures:
+                        future.result()
+        finally:
+            if owns_pool:
+                driver_pool.close_all()
+            # Let queued notifications go out before the SMTP connection is closed
+            self.drain_notifications()
+            self.close_smtp_transport()
+            self.save_listing_history()
+            self.save_detail_cache()
+            self.export_metrics()
+    
+    def merge_shards(self, delta_dir):
+        """Fold shard workers' deltas into the shared state and send the notifications they queued.
+        
+        Notifications are queued in the outbox before any seen IDs are merged, so a failed merge
+        never records cars as seen without their alerts. The workers' cars are combined into one
+        digest per profile. Outbox and digest deltas are deleted as soon as they are queued, since
+        their jobs must only be queued once; seen IDs and history rows merge as a union
+        (re-merging is harmless).
+        """
+        dispatcher_config = self.config.get('notification_settings', {}).get('dispatcher', {})
+        outbox_deltas = sorted(glob.glob(os.path.join(delta_dir, '*.outbox.db')))
+        queued = 0
+        for path in outbox_deltas:
+            queued += merge_outbox(dispatcher_config.get('outbox_path', 'seen_cars.db'), path)
+            os.remove(path)
+        if outbox_deltas:
+            print(f"📬 {queued} undelivered notifications from the shards queued for delivery")
+            # Starting the dispatcher resumes every pending job, including the merged ones
+            self.get_dispatcher()
+        
+        digest_deltas = sorted(glob.glob(os.path.join(delta_dir, '*.digests.jsonl')))
+        digests = {}
+        for path in digest_deltas:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    name = entry['profile'].get('name', DEFAULT_NAMESPACE)
+                    profile, cars = digests.setdefault(name, (entry['profile'], {}))
+                    for car in entry['cars']:
+                        cars.setdefault(car['id'], car)
+        for profile, cars in digests.values():
+            self.send_comprehensive_email([Listing.from_dict(car) for car in cars.values()], profile)
+        for path in digest_deltas:
+            os.remove(path)
+        if digests:
+            print(f"📧 Queued {len(digests)} digests from {len(digest_deltas)} shards")
+        
+        store_config = self.config.get('seen_store', {})
+        seen_deltas = sorted(glob.glob(os.path.join(delta_dir, '*.seen.jsonl')))
+        # Shard workers leave seen_state alone, so the one-time SQLite import happens here
+        import_sqlite(
+            store_config.get('journal_dir', 'seen_state'),
+            store_config.get('path', 'seen_cars.db'),
+            store_config.get('legacy_json_path', 'seen_cars.json'),
+            ttl_days=store_config.get('ttl_days', 90),
+            max_entries=store_config.get('max_entries', 5000)
+        )
+        merged = merge_deltas(
+            store_config.get('journal_dir', 'seen_state'), seen_deltas,
+            compact_after_entries=store_config.get('compact_after_entries', 1000),
+            ttl_days=store_config.get('ttl_days', 90),
+            max_entries=store_config.get('max_entries', 5000)
+        )
+        for path in seen_deltas:
+            os.remove(path)
+        print(f"🧩 Merged {merged} seen entries from {len(seen_deltas)} shards")
+        
+        history_deltas = sorted(glob.glob(os.path.join(delta_dir, '*.history.npz')))
+        history = self.get_listing_history() if history_deltas else None
+        if history is not None:
+            added = sum(history.merge(path) for path in history_deltas)
+            self.save_listing_history()
+            for path in history_deltas:
+                os.remove(path)
+            print(f"🧩 Merged {added} new listings into the history")
+        
+        if outbox_deltas or digests:
+            self.drain_notifications()
+            self.close_smtp_transport()
+    
+    def export_metrics(self):
+        """Write the finished run's timings and counters to the configured metrics sinks"""
+        metrics_config = self.config.get('metrics', {})
+        try:
+            summary = self.metrics.export(
+                jsonl_path=metrics_config.get('jsonl_path'),
+                prometheus_path=metrics_config.get('prometheus_textfile_path')
+            )
+        except OSError as e:
+            print(f"⚠️ Could not write run metrics: {e}")
+            return
+        slowest = sorted(summary['stages'].items(), key=lambda item: item[1]['total_seconds'], reverse=True)[:3]
+        print(f"📈 Run took {summary['duration_seconds']:.1f}s; slowest stages: "
+              + (", ".join(f"{stage} {stats['total_seconds']:.1f}s" for stage, stats in slowest) or "none"))
+    
+    def browser_memory_mb(self, driver_pool):
+        """Return the largest JS heap (MB) among the pool's live browsers"""
+        largest = 0
+        for driver in driver_pool.drivers():
+            try:
+                used_bytes = driver.execute_script(
+                    "return performance.memory ? performance.memory.usedJSHeapSize : 0"
+                ) or 0
+                largest = max(largest, used_bytes / (1024 * 1024))
+            except Exception as e:
+                print(f"⚠️ Could not read browser memory: {e}")
+        return largest
+    
+    def run_daemon(self):
+        """Scrape every check_interval_minutes, keeping warm browsers and seen-state between cycles"""
+        settings = self.config['scraping_settings']
+        interval_seconds = settings.get('check_interval_minutes', 15) * 60
+        timeout_seconds = settings.get('timeout_minutes', 3) * 60
+        recycle_after_cycles = settings.get('recycle_driver_after_cycles', 20)
+        recycle_memory_mb = settings.get('recycle_driver_memory_mb', 512)
+        
+        print(f"🔁 Daemon mode: scraping every {settings.get('check_interval_minutes', 15)} minutes "
+              f"(cycle timeout {settings.get('timeout_minutes', 3)} minutes)")
+        
+        driver_pool = self.create_driver_pool()
+        cycle_thread = None
+        cycles_since_recycle = 0
+        cycle = 0
         try:
-            driver = self.setup_driver()
-            search_url = self.build_search_url()
+            while True:
+                cycle += 1
+                cycle_start = time.monotonic()
+                
+                if cycle_thread and cycle_thread.is_alive():
+                    print(f"⚠️ Previous cycle is still shutting down - skipping cycle {cycle}")
+                else:
+                    print(f"⏰ Cycle {cycle} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                    cycle_thread = threading.Thread(target=self.scrape_cars, args=(driver_pool,), daemon=True)
+                    cycle_thread.start()
+                    cycle_thread.join(timeout_seconds)
+                    
+                    if cycle_thread.is_alive():
+                        # Watchdog: killing the browsers unblocks any WebDriver call the cycle is stuck in
+                        print(f"⏱️ Cycle {cycle} exceeded {settings.get('timeout_minutes', 3)} minutes - restarting browsers")
+                        driver_pool.close_all()
+                        cycles_since_recycle = 0
+                    else:
+                        cycles_since_recycle += 1
+                        print(f"✅ Cycle {cycle} finished in {time.monotonic() - cycle_start:.1f}s")
+                        
+                        memory_mb = self.browser_memory_mb(driver_pool)
+                        if recycle_after_cycles and cycles_since_recycle >= recycle_after_cycles:
+                            print(f"♻️ Recycling browsers after {cycles_since_recycle} cycles")
+                            driver_pool.close_all()
+                            cycles_since_recycle = 0
+                        elif recycle_memory_mb and memory_mb > recycle_memory_mb:
+                            print(f"♻️ Recycling browsers using {memory_mb:.0f}MB JS heap")
+                            driver_pool.close_all()
+                            cycles_since_recycle = 0
+                
+                time.sleep(max(0, interval_seconds - (time.monotonic() - cycle_start)))
+        finally:
+            driver_pool.close_all()
+            self.stop_notifications()
+    
+    @staticmethod
+    def build_page_url(search_url, page):
+        """Return the URL of a given results page (page 1 is the plain search URL)"""
+        if page <= 1:
+            return search_url
+        separator = '&' if '?' in search_url else '?'
+        return f"{search_url}{separator}page={page}"
+    
+    def iter_page_cars(self, page_url, driver_pool, label="", known_ids=None):
+        """Yield the Listings of a single results page, using the browser only when HTTP fails.
+        
+        With two_phase_extraction, cards whose ID is in known_ids are not extracted; they are
+        yielded in page order as build_known_listing() placeholders.
+        """
+        # Try the lightweight HTTP path first; the browser only starts when it returns nothing or is blocked
+        if self.config['scraping_settings'].get('fetch_mode', 'http') == 'http':
+            extracted_cars = self.fetch_cars_http(page_url)
+            # An empty feed is a real end of results, not a reason to start the browser
+            if extracted_cars is not None:
+                self.metrics.incr('listings_found', len(extracted_cars))
+                print(f"📊 {label}Found {len(extracted_cars)} listings")
+                yield from extracted_cars
+                return
+            print(f"🔁 {label}HTTP fetch failed - falling back to the browser")
+        
+        driver = driver_pool.acquire()
+        try:
+            with self.metrics.span('driver_get'):
+                driver.get(page_url)
             
-            print(f"📍 Searching: {search_url}")
-            driver.get(search_url)
+            # Wait until the feed is populated and stable instead of a fixed sleep
+            with self.metrics.span('wait_for_feed'):
+                self.wait_for_feed(driver)
             
-            # Wait for page to load
-            time.sleep(10)
+            settings = self.config['scraping_settings']
+            extraction_mode = settings.get('extraction_mode', 'batch')
+            two_phase = known_ids is not None and settings.get('two_phase_extraction', True)
             
-            # Find car listings using the real yad2 selectors
-            car_elements = driver.find_elements(By.CSS_SELECTOR, '[data-nagish="feed-item-base-link"]')
+            # Phase one: read only the IDs so that phase two can skip cards we have already seen
+            card_count, known_cards, new_indices = 0, {}, None
+            if two_phase and extraction_mode != 'page_source':
+                try:
+                    with self.metrics.span('extract_ids'):
+                        card_count, known_cards, new_indices = self.read_known_listings(driver, known_ids)
+                    print(f"🆔 {label}{len(new_indices)} of {card_count} listings are new")
+                except Exception as e:
+                    print(f"⚠️ {label}Could not read listing IDs - extracting every card: {e}")
+                    card_count, known_cards, new_indices = 0, {}, None
             
-            print(f"📊 Found {len(car_elements)} listings")
+            # Batch mode reads the whole feed in one round trip, page_source mode parses the captured HTML
+            # offline, and per_element queries each card (also the fallback if batch extraction fails)
+            extracted_cars = None
+            if extraction_mode == 'batch':
+                with self.metrics.span('extract_batch'):
+                    # Nothing new on the page means no extraction round trip at all
+                    extracted_cars = self.extract_all_cars(driver, new_indices) if new_indices != [] else []
+                if extracted_cars is not None and new_indices is not None:
+                    # Put the extracted cards back between the known ones, in page order
+                    new_by_index = dict(zip(new_indices, extracted_cars))
+                    extracted_cars = [known_cards.get(i) or new_by_index.get(i) for i in range(card_count)]
+            elif extraction_mode == 'page_source':
+                # Capture the page and hand the browser back before parsing offline
+                page_html = driver.page_source
+                driver_pool.release(driver)
+                driver = None
+                with self.metrics.span('parse_page_source'):
+                    extracted_cars = parse_feed_html(page_html, known_ids if two_phase else None)
             
-            new_cars = []
+            if extracted_cars is not None:
+                self.metrics.incr('listings_found', len(extracted_cars))
+                print(f"📊 {label}Found {len(extracted_cars)} listings")
+                yield from extracted_cars
+            else:
+                # Find car listings using the real yad2 selectors
+                from selenium.webdriver.common.by import By
+                car_elements = driver.find_elements(By.CSS_SELECTOR, '[data-nagish="feed-item-base-link"]')
+                self.metrics.incr('listings_found', len(car_elements))
+                print(f"📊 {label}Found {len(car_elements)} listings")
+                for index, car_element in enumerate(car_elements):
+                    if index in known_cards:
+                        yield known_cards[index]
+                        continue
+                    with self.metrics.span('extract_car_data'):
+                        car_data = self.extract_car_data(car_element)
+                    yield car_data
+        except Exception:
+            if driver:
+                # The browser may be in a bad state; don't hand it to another profile
+                driver_pool.discard(driver)
+                driver = None
+            raise
+        finally:
+            if driver:
+                driver_pool.release(driver)
+    
+    def iter_profile_cars(self, search_url, driver_pool, label="", known_ids=None):
+        """Lazily walk the result pages, yielding cars as they are extracted (None for failed cards).
+        
+        Every page is read in full. The walk ends after an empty page, a page without a single
+        new ID, a page shorter than the first one (the last page), at max_pages, or once
+        max_results_per_check listings were read; the consumer may also stop it early (the
+        seen streak). A page that fails after listings were already yielded ends the walk
+        instead of losing them.
+        """
+        settings = self.config['scraping_settings']
+        max_pages = settings.get('max_pages', 5)
+        max_results = settings['max_results_per_check']
+        # A full page holds as many listings as page 1, whatever yad2's page size currently is
+        page_size = None
+        walked_ids = set()
+        
+        total = 0
+        for page in range(1, max_pages + 1):
+            page_url = self.build_page_url(search_url, page)
+            if page > 1:
+                print(f"📄 {label}Moving to results page {page}")
             
-            for i, car_element in enumerate(car_elements[:self.config['scraping_settings']['max_results_per_check']]):
-                print(f"🔍 Processing car {i+1}/{min(len(car_elements), self.config['scraping_settings']['max_results_per_check'])}")
-                
-                car_data = self.extract_car_data(car_element)
-                
-                if not car_data:
-                    print(f"❌ Failed to extract data for car {i+1}")
-                    continue
-                else:
-                    print(f"✅ Car {i+1}: {car_data.get('model', 'Unknown')[:30]} - {car_data.get('price', 'No price')}")
-                
-                # Check if we've seen this car before
-                if car_data['id'] in self.seen_cars['seen_car_ids']:
-                    continue
-                
-                new_cars.append(car_data)
-                self.seen_cars['seen_car_ids'].append(car_data['id'])
+            page_cars = self.iter_page_cars(page_url, driver_pool, label, known_ids)
+            count = 0
+            new_count = 0
+            try:
+                for car_data in page_cars:
+                    count += 1
+                    total += 1
+                    if car_data and not car_data.known and car_data.id not in walked_ids and (
+                            known_ids is None or car_data.id not in known_ids):
+                        new_count += 1
+                    if car_data:
+                        walked_ids.add(car_data.id)
+                    yield car_data
+                    if total >= max_results:
+                        print(f"📄 {label}Read {total} listings - the max_results_per_check limit")
+                        return
+            except Exception as e:
+                if not total:
+                    raise
+                self.metrics.incr('page_failures')
+                print(f"⚠️ {label}Results page {page} failed - keeping the {total} listings already read: {e}")
+                return
+            finally:
+                page_cars.close()
             
-            # Send notifications for new cars
-            if new_cars:
-                print(f"🚗 Found {len(new_cars)} new cars!")
-                
-                # Send individual WhatsApp notifications (if enabled)
-                for car in new_cars:
-                    message_parts = [
-                        "🚗 New Car Alert!",
-                        "",
-                        f"🏷️ {car['model']}",
-                        f"📅 {car['year']}" if car['year'] else "",
-                        f"👥 {car['yad']}" if car['yad'] else "",
-                        f"💰 {car['price']}",
-                        f"🏢 {car['agency']}" if car['agency'] != "private person" else "👤 Private Person",
-                        f"ℹ️ {car['marketing_text']}" if car['marketing_text'] else "",
-                        "",
-                        "",
-                        f"🔗 Link to ad: {car['link']}" if car['link'] else ""
-                    ]
+            if count == 0:
+                return
+            if new_count == 0:
+                print(f"📄 {label}Nothing new on page {page} - not reading further")
+                return
+            page_size = page_size or count
+            if count < page_size:
+                return
+        
+        print(f"📄 {label}Reached the {max_pages}-page limit")
+    
+    def scrape_query(self, query, driver_pool):
+        """Run one planned search, route its new cars to the subscribing profiles and send their digests"""
+        label = query.label
+        query_store = self.get_seen_store(query.namespace)
+        stop_after_seen = self.config['scraping_settings'].get('stop_after_seen_streak', 10)
+        
+        try:
+            # Profile stores decide who is notified; the query's store drives early stopping and two-phase extraction
+            profile_stores = {route.name: self.get_seen_store(route.name) for route in query.routes}
+            search_url = self.build_search_url(query.prefs)
+            print(f"📍 {label}Searching: {search_url}")
+            
+            new_cars = []
+            new_ids = set()
+            new_cars_by_profile = {route.name: [] for route in query.routes}
+            seen_streak = 0
+            history = self.get_listing_history()
+            
+            cars = self.iter_profile_cars(search_url, driver_pool, label, known_ids=query_store)
+            try:
+                for i, car_data in enumerate(cars, 1):
+                    print(f"🔍 {label}Processing car {i}")
                     
-                    # Filter out empty parts
-                    message = "\n".join(filter(None, message_parts))
-                    print(f"📩 Email notification prepared for: {car['model']}")
+                    if not car_data:
+                        self.metrics.incr('extraction_failures')
+                        print(f"❌ {label}Failed to extract data for car {i}")
+                        continue
+                    elif car_data.known:
+                        print(f"⏭️ {label}Car {i}: already seen ({car_data.id})")
+                        if history is not None:
+                            history.touch(car_data.id)
+                    else:
+                        print(f"✅ {label}Car {i}: {car_data.model[:30]} - {car_data.price_text}")
+                        if history is not None:
+                            history.observe(car_data)
                     
-                    # Send WhatsApp notification with image
-                    # self.send_whatsapp_message(message, car.get('image_url'))
+                    # Check if we've seen this car before; a long run of known cars means we've caught up
+                    if car_data.id in query_store:
+                        for store in profile_stores.values():
+                            store.touch(car_data.id)
+                        seen_streak += 1
+                        if stop_after_seen and seen_streak >= stop_after_seen:
+                            print(f"⏹️ {label}{seen_streak} already-seen cars in a row - stopping early")
+                            break
+                        continue
                     
-                    time.sleep(1)  # Rate limiting between WhatsApp messages
-                
-                # Send ONE comprehensive email with all cars
-                self.send_comprehensive_email(new_cars)
-            else:
-                print("😴 No new cars found")
+                    seen_streak = 0
+                    # Marked as seen only once notified, so a failure below alerts them next time
+                    if car_data.id not in new_ids:
+                        new_ids.add(car_data.id)
+                        new_cars.append(car_data)
+            finally:
+                # Closing the generator hands any browser it holds back to the pool
+                cars.close()
+            
+            if new_cars:
+                # Item pages are only opened for cars no profile of this query has seen
+                self.enrich_new_cars(new_cars, label)
+                self.score_new_cars(new_cars)
+            
+            for car_data in new_cars:
+                for route in query.routes:
+                    if not route.accepts(car_data):
+                        continue
+                    store = profile_stores[route.name]
+                    if store is not query_store and car_data.id in store:
+                        store.touch(car_data.id)
+                        continue
+                    new_cars_by_profile[route.name].append(car_data)
+            for route in query.routes:
+                profile_cars = new_cars_by_profile[route.name]
+                self.notify_profile(route.profile, profile_cars)
+                for car_data in profile_cars:
+                    profile_stores[route.name].add(car_data.id)
+            for car_data in new_cars:
+                query_store.add(car_data.id)
             
             # Update last check time
-            self.seen_cars['last_check'] = datetime.now().isoformat()
-            self.save_seen_cars()
+            now = datetime.now().isoformat()
+            for namespace in {query.namespace, *profile_stores}:
+                self.get_seen_store(namespace).last_check = now
+                self.save_seen_cars(namespace)
             
         except Exception as e:
-            print(f"❌ Scraping error: {e}")
-        finally:
-            if driver:
-                driver.quit()
+            self.metrics.incr('profile_failures', len(query.routes))
+            print(f"❌ {label}Scraping error: {e}")
     
+    def notify_profile(self, profile, new_cars):
+        """Queue a profile's WhatsApp alerts (if enabled) and its email digest"""
+        name = profile.get('name', DEFAULT_NAMESPACE)
+        label = f"[{name}] " if name != DEFAULT_NAMESPACE else ""
+        if not new_cars:
+            print(f"😴 {label}No new cars found")
+            return
+        
+        self.metrics.incr('new_cars', len(new_cars))
+        print(f"🚗 {label}Found {len(new_cars)} new cars!")
+        # Queue individual WhatsApp alerts (if enabled); the dispatcher rate-limits them
+        if self.config['notification_settings'].get('dispatcher', {}).get('whatsapp_alerts', False):
+            for car in new_cars:
+                message_parts = [
+                    "🚗 New Car Alert!",
+                    "",
+                    f"🏷️ {car.model}",
+                    f"📅 {car.year}" if car.year else "",
+                    f"👥 {car.yad}" if car.hand else "",
+                    f"💰 {car.price_text}",
+                    f"🛣️ {car.km_text}" if car.km is not None else "",
+                    f"📍 {car.location}" if car.location else "",
+                    f"🏢 {car.agency}" if not car.is_private else "👤 Private Person",
+                    f"ℹ️ {car.marketing_text}" if car.marketing_text else "",
+                    describe_market(car.market),
+                    "",
+                    "",
+                    f"🔗 Link to ad: {car.link}" if car.link else ""
+                ]
+                
+                # Filter out empty parts
+                message = "\n".join(filter(None, message_parts))
+                self.notify('whatsapp', {'message': message, 'image_url': car.image_url})
+        
+        # Send ONE comprehensive email with all cars of this profile
+        if self.shard is not None:
+            # A split search can put one profile's cars on several workers; the merge sends one digest
+            self.defer_digest(profile, new_cars)
+        else:
+            self.send_comprehensive_email(new_cars, profile)
+    
+    def defer_digest(self, profile, new_cars):
+        """Shard workers: record a profile's new cars for the digest that --merge-shards sends"""
+        line = json.dumps({'profile': profile, 'cars': [car.to_dict() for car in new_cars]}, ensure_ascii=False)
+        with self.digest_delta_lock:
+            with open(self.shard_path('digests.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+    
+def profile_startup():
+    """Print an import/init time breakdown so cold-start savings can be checked"""
+    print("⏱️ Startup profile")
+    print(f"   main.py module load: {(MODULE_LOADED_AT - MODULE_LOAD_START) * 1000:.1f}ms")
+    
+    init_start = time.perf_counter()
+    Yad2CarScraper()
+    print(f"   Yad2CarScraper init: {(time.perf_counter() - init_start) * 1000:.1f}ms")
+    
+    # What each lazily imported dependency costs on the paths that actually need it
+    loaded_at_startup = set(sys.modules)
+    for label, module_name in LAZY_DEPENDENCIES:
+        if module_name in loaded_at_startup:
+            print(f"   {label}: already loaded at startup")
+            continue
+        if module_name in sys.modules:
+            print(f"   {label}: pulled in by an earlier dependency")
+            continue
+        import_start = time.perf_counter()
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"   {label}: not installed ({e})")
+            continue
+        print(f"   {label}: {(time.perf_counter() - import_start) * 1000:.1f}ms (deferred)")
+
 def main():
+    parser = argparse.ArgumentParser(description="Monitor yad2.co.il for new car listings")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and scrape every check_interval_minutes")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print the import and init time breakdown and exit")
+    parser.add_argument('--shard', metavar='I/N',
+                        help="run only worker I's share (0-based) of N shards, writing state to the delta dir")
+    parser.add_argument('--merge-shards', action='store_true',
+                        help="merge the shard workers' deltas into the shared state and exit")
+    parser.add_argument('--delta-dir', default=CONFIG.get('sharding', {}).get('delta_dir', 'shard_deltas'),
+                        help="directory for shard worker deltas (default: %(default)s)")
+    args = parser.parse_args()
+    
+    if args.profile_startup:
+        profile_startup()
+        return
+    
     print("🚗 Yad2 Car Scraper Starting...")
     print(f"⏰ Running at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
@@ -708,16 +1768,37 @@ def main():
         print("❌ Configuration not loaded. Exiting.")
         return
     
+    failed = False
     try:
-        # Run single scrape
-        scraper.scrape_cars()
-        print("✅ Scrape completed successfully")
+        if args.merge_shards:
+            scraper.merge_shards(args.delta_dir)
+            print("✅ Shard merge completed successfully")
+            return
+        if args.shard:
+            try:
+                index, count = (int(part) for part in args.shard.split('/'))
+                scraper.configure_shard(index, count, args.delta_dir)
+            except ValueError as e:
+                parser.error(f"--shard expects I/N with 0 <= I < N ({e})")
+        if args.daemon:
+            # Keep running on the configured interval with warm browsers
+            scraper.run_daemon()
+        else:
+            # Run single scrape
+            scraper.scrape_cars()
+            print("✅ Scrape completed successfully")
     except KeyboardInterrupt:
         print("\n👋 Scraper interrupted by user")
     except Exception as e:
         print(f"❌ Fatal error: {e}")
+        # A failed merge must fail the job, so the workflow does not commit half-merged state
+        failed = args.merge_shards
+    finally:
+        scraper.stop_notifications()
     
     print(f"⏰ Finished at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Vectorized market-price scoring
+Groups the whole listing history by model and year with NumPy, computes price percentiles
+and days-on-market per group in bulk, and rates new listings against their group
+"""
+
+from listing_history import SECONDS_PER_DAY, normalize_model
+
+# model_index * YEAR_SPAN + year gives one integer key per (model, year) group
+YEAR_SPAN = 10000
+
+
+def _group_quantiles(values_sorted, starts, counts, fraction):
+    """Linear-interpolated quantile of every group in a (group, value)-sorted array"""
+    import numpy as np
+
+    position = (counts - 1) * fraction
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    low_values = values_sorted[starts + low]
+    high_values = values_sorted[starts + high]
+    return low_values + (high_values - low_values) * (position - low)
+
+
+class MarketScorer:
+    """Per model/year price percentiles and days-on-market over a ListingHistory snapshot"""
+
+    def __init__(self, columns, min_comparables=5, below_market_threshold=0.05, exclude_ids=()):
+        import numpy as np
+
+        self.min_comparables = min_comparables
+        self.below_market_threshold = below_market_threshold
+
+        # Only rows with a parsed price and year can be compared; the listings being scored are
+        # left out so a car is never one of its own comparables
+        valid = (columns['price'] > 0) & (columns['year'] > 0)
+        if exclude_ids:
+            valid &= ~np.isin(columns['id'], list(exclude_ids))
+        models = columns['model'][valid]
+        years = columns['year'][valid].astype(np.int64)
+        prices = columns['price'][valid].astype(np.int64)
+        days_on_market = (columns['last_seen'][valid] - columns['first_seen'][valid]) / SECONDS_PER_DAY
+
+        unique_models, model_ids = np.unique(models, return_inverse=True)
+        self._model_ids = {model: i for i, model in enumerate(unique_models.tolist())}
+        self.group_keys, group_ids = np.unique(model_ids.astype(np.int64) * YEAR_SPAN + years,
+                                               return_inverse=True)
+        group_count = len(self.group_keys)
+        self.counts = np.bincount(group_ids, minlength=group_count)
+        self.starts = np.zeros(group_count, dtype=np.int64)
+        if group_count:
+            self.starts[1:] = np.cumsum(self.counts)[:-1]
+
+        # Prices sorted within each group, encoded so a single searchsorted finds a price's rank
+        price_order = np.lexsort((prices, group_ids))
+        self._sorted_prices = prices[price_order]
+        self._price_scale = int(prices.max()) + 1 if len(prices) else 1
+        self._sorted_price_keys = group_ids[price_order].astype(np.int64) * self._price_scale + self._sorted_prices
+
+        dom_order = np.lexsort((days_on_market, group_ids))
+        sorted_days = days_on_market[dom_order]
+
+        if group_count:
+            self.p25_price = _group_quantiles(self._sorted_prices, self.starts, self.counts, 0.25)
+            self.median_price = _group_quantiles(self._sorted_prices, self.starts, self.counts, 0.5)
+            self.p75_price = _group_quantiles(self._sorted_prices, self.starts, self.counts, 0.75)
+            self.median_days_on_market = _group_quantiles(sorted_days, self.starts, self.counts, 0.5)
+        else:
+            self.p25_price = self.median_price = self.p75_price = self.median_days_on_market = np.empty(0)
+
+    @classmethod
+    def from_history(cls, history, **kwargs):
+        """Build a scorer over everything currently in a ListingHistory (minus any exclude_ids)"""
+        return cls(history.columns(), **kwargs)
+
+    def score(self, cars):
+        """Return one market dict (or None when there is nothing to compare with) per car"""
+        import numpy as np
+
+        if not cars or not len(self.group_keys):
+            return [None] * len(cars)
+
+        prices = np.array([car.price or 0 for car in cars], dtype=np.int64)
+        years = np.array([car.year or 0 for car in cars], dtype=np.int64)
+        model_ids = np.array([self._model_ids.get(normalize_model(car.model), -1) for car in cars], dtype=np.int64)
+
+        keys = model_ids * YEAR_SPAN + years
+        groups = np.clip(np.searchsorted(self.group_keys, keys), 0, len(self.group_keys) - 1)
+        found = (model_ids >= 0) & (prices > 0) & (years > 0) & (self.group_keys[groups] == keys)
+
+        # Share of the group priced strictly below each car
+        price_keys = groups * self._price_scale + np.minimum(prices, self._price_scale)
+        ranks = np.searchsorted(self._sorted_price_keys, price_keys, side='left') - self.starts[groups]
+        counts = self.counts[groups]
+        percentiles = np.where(counts > 0, ranks / np.maximum(counts, 1), 0.0)
+        medians = self.median_price[groups]
+        discounts = np.where(medians > 0, (medians - prices) / np.maximum(medians, 1), 0.0)
+
+        results = []
+        for i in range(len(cars)):
+            if not found[i]:
+                results.append(None)
+                continue
+            comparables = int(counts[i])
+            results.append({
+                'comparables': comparables,
+                'median_price': int(round(medians[i])),
+                'p25_price': int(round(self.p25_price[groups[i]])),
+                'p75_price': int(round(self.p75_price[groups[i]])),
+                'percentile': int(round(percentiles[i] * 100)),
+                'discount': float(discounts[i]),
+                'median_days_on_market': float(self.median_days_on_market[groups[i]]),
+                'below_market': bool(comparables >= self.min_comparables
+                                     and discounts[i] >= self.below_market_threshold),
+                'above_market': bool(comparables >= self.min_comparables
+                                     and discounts[i] <= -self.below_market_threshold),
+            })
+        return results
+
+
+def describe_market(market):
+    """One-line digest text for a market dict, or "" when there is not enough history"""
+    if not market or market['comparables'] < 2:
+        return ""
+    summary = (f"median ₪{market['median_price']:,} over {market['comparables']} listings, "
+               f"~{market['median_days_on_market']:.0f} days on market")
+    if market['below_market']:
+        return f"🔥 {market['discount']:.0%} below market ({summary})"
+    if market['above_market']:
+        return f"📈 {-market['discount']:.0%} above market ({summary})"
+    return f"⚖️ At market price ({summary})"
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Yad2 model catalogue
+Loads the bundled make/model catalogue (data/yad2_models.json) into a normalized index so
+config names resolve to yad2 model codes with one dict lookup, including Hebrew/English
+spellings and aliases ("IS 300h" == "is300h"). The built index is cached with marshal and
+only rebuilt when the catalogue file changes. Misses get "did you mean" suggestions
+"""
+
+import difflib
+import json
+import marshal
+import os
+import sys
+import threading
+import unicodedata
+
+DEFAULT_CATALOGUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'yad2_models.json')
+DEFAULT_INDEX_CACHE_PATH = '~/.cache/yad2-scraper/model_index.marshal'
+# Bump when the index layout changes so older caches are rebuilt
+INDEX_VERSION = 1
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+
+class UnknownModelError(ValueError):
+    """Raised when a configured model name is not in the catalogue"""
+
+    def __init__(self, name, suggestions):
+        self.name = name
+        self.suggestions = suggestions
+        hint = f" - did you mean {', '.join(repr(s) for s in suggestions)}?" if suggestions else ""
+        super().__init__(f"Unknown car model {name!r}{hint}")
+
+
+def normalize_name(name):
+    """Index key for a model name: case, spacing, hyphens and quote marks are ignored"""
+    text = unicodedata.normalize('NFKC', str(name or '')).casefold()
+    return ''.join(ch for ch in text if ch.isalnum())
+
+
+def _entry_names(entry):
+    """(full names, short names) a catalogue entry can be referred to by"""
+    make, model = entry.get('make', ''), entry.get('model', '')
+    make_he, model_he = entry.get('make_he') or make, entry.get('model_he') or model
+    full = {f"{m} {n}" for m in (make, make_he) for n in (model, model_he)}
+    full.update(entry.get('aliases', []))
+    # A bare model name ("focus", "IS 300h") is only used when no other make shares it
+    return full, {model, model_he}
+
+
+def build_index(models):
+    """Build {normalized name: code} for {code: entry}; returns (index, ambiguous keys)"""
+    index = {}
+    ambiguous = set()
+    short_names = {}
+    for code, entry in models.items():
+        index[normalize_name(code)] = code
+        full, short = _entry_names(entry)
+        for name in full:
+            key = normalize_name(name)
+            if key in index and index[key] != code:
+                ambiguous.add(key)
+            index[key] = code
+        for name in short:
+            short_names.setdefault(normalize_name(name), set()).add(code)
+
+    for key, codes in short_names.items():
+        if key in index:
+            continue
+        if len(codes) == 1:
+            index[key] = next(iter(codes))
+        else:
+            ambiguous.add(key)
+    for key in ambiguous:
+        index.pop(key, None)
+    index.pop('', None)
+    return index, sorted(ambiguous)
+
+
+class ModelCatalogue:
+    """Normalized name -> yad2 model code index over the catalogue entries"""
+
+    def __init__(self, models, index=None, ambiguous=None):
+        # code -> {'make', 'model', 'make_he', 'model_he', 'aliases'}
+        self.models = models
+        if index is None:
+            index, ambiguous = build_index(models)
+        self._index = index
+        self._ambiguous = set(ambiguous or ())
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_CATALOGUE_PATH):
+        """Parse a catalogue JSON file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        models = {}
+        for entry in data.get('models', []):
+            code = str(entry['code'])
+            models[code] = {key: value for key, value in entry.items() if key != 'code'}
+        return cls(models)
+
+    def __len__(self):
+        return len(self.models)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._index
+
+    def resolve(self, name):
+        """Return the yad2 model code for a name, or None"""
+        return self._index.get(normalize_name(name))
+
+    def resolve_title(self, title):
+        """Model code for a listing title such as "טויוטה קורולה הייבריד" (longest known leading words), or None"""
+        words = str(title or '').split()
+        for end in range(len(words), 0, -1):
+            code = self._index.get(normalize_name(' '.join(words[:end])))
+            if code is not None:
+                return code
+        return None
+
+    def display_name(self, code):
+        """'Make Model' for a code"""
+        entry = self.models.get(code, {})
+        return f"{entry.get('make', '')} {entry.get('model', '')}".strip() or code
+
+    def suggest(self, name, limit=3):
+        """Closest catalogue names to an unknown name (only computed on a miss)"""
+        key = normalize_name(name)
+        suggestions = []
+        if key in self._ambiguous:
+            # A bare model name shared by several makes: offer every make's full name
+            for code, entry in self.models.items():
+                if key in {normalize_name(entry.get('model')), normalize_name(entry.get('model_he'))}:
+                    suggestions.append(self.display_name(code))
+        for match in difflib.get_close_matches(key, self._index, n=limit * 3, cutoff=0.6):
+            suggestions.append(self.display_name(self._index[match]))
+        return list(dict.fromkeys(suggestions))[:limit]
+
+    def codes(self, names):
+        """Resolve a list of names to codes (duplicates removed), raising UnknownModelError on a miss"""
+        codes = []
+        for name in names:
+            code = self.resolve(name)
+            if code is None:
+                raise UnknownModelError(name, self.suggest(name))
+            if code not in codes:
+                codes.append(code)
+        return codes
+
+    def to_cache(self, signature):
+        """Plain-data form of the built index for marshal"""
+        return {'signature': signature, 'models': self.models, 'index': self._index,
+                'ambiguous': sorted(self._ambiguous)}
+
+
+def _signature(path):
+    """Identifies one version of the catalogue file (and of the index/marshal format)"""
+    stat_result = os.stat(path)
+    return [INDEX_VERSION, marshal.version, sys.version_info[:2], stat_result.st_size, stat_result.st_mtime_ns]
+
+
+def load_catalogue(path=DEFAULT_CATALOGUE_PATH, cache_path=DEFAULT_INDEX_CACHE_PATH):
+    """Load the catalogue from the marshal index cache, rebuilding the cache if the file changed"""
+    signature = _signature(path)
+    cache_path = os.path.expanduser(cache_path) if cache_path else None
+    if cache_path:
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = marshal.load(f)
+            if isinstance(cached, dict) and cached.get('signature') == signature:
+                return ModelCatalogue(cached['models'], cached['index'], cached['ambiguous'])
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            pass
+
+    catalogue = ModelCatalogue.from_file(path)
+    if cache_path:
+        try:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            tmp_path = f"{cache_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                marshal.dump(catalogue.to_cache(signature), f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not cache the model index: {e}")
+    return catalogue
+
+
+def get_catalogue():
+    """The bundled catalogue, loaded once per process"""
+    global _catalogue
+    with _catalogue_lock:
+        if _catalogue is None:
+            _catalogue = load_catalogue()
+        return _catalogue
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python model_catalogue.py <model name> [<model name> ...]")
+        sys.exit(1)
+    catalogue = get_catalogue()
+    for model_name in sys.argv[1:]:
+        model_code = catalogue.resolve(model_name)
+        if model_code:
+            print(f"✅ {model_name!r} -> {model_code} ({catalogue.display_name(model_code)})")
+        else:
+            print(f"❌ {UnknownModelError(model_name, catalogue.suggest(model_name))}")
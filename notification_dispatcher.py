@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Asynchronous notification dispatcher
+Outbound WhatsApp and email jobs are written to a SQLite outbox and delivered by one
+background worker per channel, with a per-channel rate limit and exponential backoff.
+A job leaves the outbox only once it is delivered, so alerts survive crashes and are
+retried on the next run
+"""
+
+import heapq
+import json
+import random
+import sqlite3
+import threading
+import time
+
+
+OUTBOX_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS notification_outbox ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL, "
+    "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+    "next_attempt_at REAL NOT NULL, created_at REAL NOT NULL, last_error TEXT)"
+)
+
+
+class PermanentDeliveryError(Exception):
+    """Raised by a channel handler when retrying cannot help (e.g. the channel is not configured)"""
+
+
+class NotificationDispatcher:
+    """Queues notification jobs and delivers them in the background"""
+
+    def __init__(self, outbox_path, handlers, min_intervals=None, max_attempts=8,
+                 backoff_base_seconds=2, backoff_max_seconds=300):
+        self.outbox_path = outbox_path
+        # channel -> callable(payload); raising schedules a retry
+        self.handlers = handlers
+        self.min_intervals = min_intervals or {}
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+        # channel -> heap of (next_attempt_at, job_id, attempts, payload)
+        self._queues = {channel: [] for channel in handlers}
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._db_lock = threading.Lock()
+        self._workers = []
+        self._stopping = False
+
+    def _connect(self):
+        """Open the outbox database, creating the table if needed"""
+        conn = sqlite3.connect(self.outbox_path, timeout=30)
+        conn.execute(OUTBOX_SCHEMA)
+        return conn
+
+    def _execute(self, sql, params=()):
+        """Run one write against the outbox and return the cursor's lastrowid"""
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.execute(sql, params).lastrowid
+            finally:
+                conn.close()
+
+    def start(self):
+        """Reload undelivered jobs from earlier runs and start one worker per channel"""
+        if self._workers:
+            return self
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT id, channel, payload, attempts, next_attempt_at FROM notification_outbox "
+                    "WHERE status = 'pending' ORDER BY id"
+                ).fetchall()
+            finally:
+                conn.close()
+
+        resumed = 0
+        with self._condition:
+            for job_id, channel, payload, attempts, next_attempt_at in rows:
+                if channel in self._queues:
+                    heapq.heappush(self._queues[channel], (next_attempt_at, job_id, attempts, json.loads(payload)))
+                    resumed += 1
+        if resumed:
+            print(f"📬 Resuming {resumed} undelivered notifications from the outbox")
+
+        self._stopping = False
+        for channel in self.handlers:
+            worker = threading.Thread(target=self._run_channel, args=(channel,), daemon=True,
+                                      name=f"notify-{channel}")
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def enqueue(self, channel, payload):
+        """Persist a job and hand it to its channel's worker; returns immediately"""
+        if channel not in self.handlers:
+            raise ValueError(f"Unknown notification channel: {channel}")
+        now = time.time()
+        job_id = self._execute(
+            "INSERT INTO notification_outbox (channel, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+            (channel, json.dumps(payload, ensure_ascii=False), now, now)
+        )
+        with self._condition:
+            heapq.heappush(self._queues[channel], (now, job_id, 0, payload))
+            self._condition.notify_all()
+        return job_id
+
+    def _backoff(self, attempts):
+        """Exponential backoff with jitter for the given number of failed attempts"""
+        delay = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _run_channel(self, channel):
+        """Deliver one channel's jobs in order, no faster than its minimum interval"""
+        handler = self.handlers[channel]
+        min_interval = self.min_intervals.get(channel, 0)
+        last_sent_at = 0.0
+        queue = self._queues[channel]
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopping:
+                        return
+                    now = time.monotonic()
+                    wall_now = time.time()
+                    if queue:
+                        due_in = max(queue[0][0] - wall_now, last_sent_at + min_interval - now)
+                        if due_in <= 0:
+                            break
+                        self._condition.wait(due_in)
+                    else:
+                        self._condition.wait()
+                _, job_id, attempts, payload = heapq.heappop(queue)
+                self._in_flight += 1
+
+            last_sent_at = time.monotonic()
+            error = None
+            try:
+                handler(payload)
+            except Exception as e:
+                error = e
+            try:
+                if error is None:
+                    self._execute("DELETE FROM notification_outbox WHERE id = ?", (job_id,))
+                    self._count('sent')
+                else:
+                    self._record_failure(channel, job_id, attempts + 1, payload, error)
+            except sqlite3.Error as db_error:
+                print(f"⚠️ Could not update the notification outbox: {db_error}")
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _record_failure(self, channel, job_id, attempts, payload, error):
+        """Schedule a retry, or park the job as failed once retrying is pointless"""
+        if isinstance(error, PermanentDeliveryError) or attempts >= self.max_attempts:
+            self._execute(
+                "UPDATE notification_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                (attempts, str(error), job_id)
+            )
+            self._count('failed')
+            print(f"❌ Giving up on {channel} notification {job_id} after {attempts} attempts: {error}")
+            return
+
+        next_attempt_at = time.time() + self._backoff(attempts)
+        self._execute(
+            "UPDATE notification_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (attempts, next_attempt_at, str(error), job_id)
+        )
+        self._count('retried')
+        print(f"🔁 {channel} notification {job_id} failed ({error}) - retry {attempts} "
+              f"in {next_attempt_at - time.time():.0f}s")
+        with self._condition:
+            heapq.heappush(self._queues[channel], (next_attempt_at, job_id, attempts, payload))
+            self._condition.notify_all()
+
+    def _count(self, outcome):
+        """Bump a delivery statistic"""
+        with self._condition:
+            self.stats[outcome] += 1
+
+    def pending(self):
+        """Number of jobs queued or being delivered"""
+        with self._condition:
+            return self._in_flight + sum(len(queue) for queue in self._queues.values())
+
+    def drain(self, timeout):
+        """Wait up to `timeout` seconds for every queued job to be delivered; returns how many remain.
+
+        Returns early once only retries scheduled after the deadline are left; those stay in the
+        outbox and are resumed by the next start().
+        """
+        deadline = time.monotonic() + timeout
+        wall_deadline = time.time() + timeout
+        with self._condition:
+            while self._in_flight or any(queue and queue[0][0] <= wall_deadline for queue in self._queues.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+        return self.pending()
+
+    def stop(self):
+        """Stop the workers; undelivered jobs stay in the outbox"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=5)
+        self._workers = []
+        with self._condition:
+            for queue in self._queues.values():
+                queue.clear()
+
+
+def merge_outbox(outbox_path, other_path):
+    """Copy the undelivered jobs of another outbox (e.g. a shard worker's) into this one; returns how many.
+
+    Delete other_path afterwards, since merging the same jobs twice would send them twice.
+    """
+    conn = sqlite3.connect(outbox_path, timeout=30)
+    try:
+        conn.execute(OUTBOX_SCHEMA)
+        conn.execute("ATTACH DATABASE ? AS other", (other_path,))
+        has_outbox = conn.execute(
+            "SELECT 1 FROM other.sqlite_master WHERE type = 'table' AND name = 'notification_outbox'"
+        ).fetchone()
+        if not has_outbox:
+            return 0
+        with conn:
+            return conn.execute(
+                "INSERT INTO notification_outbox (channel, payload, status, attempts, next_attempt_at, created_at, last_error) "
+                "SELECT channel, payload, status, attempts, next_attempt_at, created_at, last_error "
+                "FROM other.notification_outbox WHERE status = 'pending' ORDER BY id"
+            ).rowcount
+    finally:
+        conn.close()
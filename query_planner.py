@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Search query planner
+Merges search profiles into as few yad2 searches as possible: profiles that agree on the
+filters a result card does not show (engine type, gearbox, mileage) share one query, with
+their models comma-joined and their price/year ranges widened to the envelope. Every result
+of a shared query is routed back to the profiles whose own criteria it meets
+"""
+
+import hashlib
+
+from model_catalogue import get_catalogue
+from seen_store import DEFAULT_NAMESPACE
+from yad2_mappings import get_engine_code, get_gearbox_code, get_model_codes
+
+
+def query_shape(prefs):
+    """The filters profiles must agree on exactly to share a query: (engine codes, gearbox codes, max km)"""
+    engine_codes = sorted({code for code in map(get_engine_code, prefs.get('engine_type') or []) if code})
+    gearbox_codes = sorted({code for code in map(get_gearbox_code, prefs.get('transmission') or []) if code})
+    return (tuple(engine_codes), tuple(gearbox_codes), (prefs.get('mileage') or {}).get('max') or None)
+
+
+def _bounds(prefs, key):
+    """(min, max) of a range preference; None means unbounded, as in build_search_url"""
+    range_prefs = prefs.get(key) or {}
+    return (range_prefs.get('min') or None, range_prefs.get('max') or None)
+
+
+def _envelope(bounds):
+    """Smallest range covering every (min, max) pair"""
+    lows = [low for low, _ in bounds]
+    highs = [high for _, high in bounds]
+    return (None if None in lows else min(lows), None if None in highs else max(highs))
+
+
+def _within(value, bounds):
+    """Whether a parsed value fits a range; unparsed values pass (the search already filtered them)"""
+    low, high = bounds
+    if value is None:
+        return True
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+class ProfileRoute:
+    """A profile's share of a planned query, with the checks the query itself does not apply"""
+
+    def __init__(self, profile, model_codes, price_bounds, year_bounds):
+        self.profile = profile
+        self.name = profile.get('name', DEFAULT_NAMESPACE)
+        # Each check is None when the query's own filter is already exactly the profile's
+        self.model_codes = model_codes
+        self.price_bounds = price_bounds
+        self.year_bounds = year_bounds
+        # yad2's km filter is approximate; enriched listings are checked against the real maximum
+        self.max_km = (profile.get('car_preferences', {}).get('mileage') or {}).get('max')
+
+    def accepts(self, car):
+        """Whether a car from the shared query matches this profile.
+
+        A title the catalogue cannot resolve passes the model check, since the query only
+        asked for models that some subscribing profile wants.
+        """
+        if self.model_codes is not None:
+            code = get_catalogue().resolve_title(car.model)
+            if code is not None and code not in self.model_codes:
+                return False
+        if self.price_bounds is not None and not _within(car.price, self.price_bounds):
+            return False
+        if self.year_bounds is not None and not _within(car.year, self.year_bounds):
+            return False
+        if self.max_km and car.km is not None and car.km > self.max_km:
+            return False
+        return True
+
+
+class PlannedQuery:
+    """One yad2 search serving one or more profiles"""
+
+    def __init__(self, prefs, routes):
+        # Merged car_preferences for build_search_url (models as yad2 codes)
+        self.prefs = prefs
+        self.routes = routes
+        names = [route.name for route in routes]
+        self.name = "+".join(names)
+        if len(routes) == 1:
+            # An unshared query keeps the profile's own seen-state, exactly as before planning
+            self.namespace = names[0]
+        else:
+            self.namespace = "query-" + hashlib.sha1("\n".join(sorted(names)).encode('utf-8')).hexdigest()[:10]
+
+    @property
+    def label(self):
+        return f"[{self.name}] " if self.name != DEFAULT_NAMESPACE else ""
+
+
+def _merge(profiles):
+    """Build the shared query for profiles of the same shape"""
+    model_sets = []
+    for profile in profiles:
+        names = profile.get('car_preferences', {}).get('models')
+        model_sets.append(set(get_model_codes(names)) if names else None)
+    price_bounds = [_bounds(profile.get('car_preferences', {}), 'price_range') for profile in profiles]
+    year_bounds = [_bounds(profile.get('car_preferences', {}), 'year_range') for profile in profiles]
+
+    query_models = None
+    if None not in model_sets:
+        query_models = []
+        for codes in model_sets:
+            query_models.extend(sorted(codes - set(query_models)))
+    query_price = _envelope(price_bounds)
+    query_year = _envelope(year_bounds)
+
+    first = profiles[0].get('car_preferences', {})
+    prefs = {
+        'price_range': {'min': query_price[0], 'max': query_price[1]},
+        'year_range': {'min': query_year[0], 'max': query_year[1]},
+    }
+    if query_models:
+        prefs['models'] = query_models
+    for key in ('mileage', 'engine_type', 'transmission'):
+        if first.get(key):
+            prefs[key] = first[key]
+
+    routes = []
+    for profile, models, price, year in zip(profiles, model_sets, price_bounds, year_bounds):
+        routes.append(ProfileRoute(
+            profile,
+            model_codes=models if query_models is None or models != set(query_models) else None,
+            price_bounds=price if price != query_price else None,
+            year_bounds=year if year != query_year else None,
+        ))
+    return PlannedQuery(prefs, routes)
+
+
+def plan_queries(profiles, merge=True):
+    """Group profiles into the fewest queries (one per distinct shape, in first-seen order).
+
+    Raises model_catalogue.UnknownModelError for a profile with an unknown model name.
+    """
+    if not merge:
+        return [PlannedQuery(profile.get('car_preferences', {}), [ProfileRoute(profile, None, None, None)])
+                for profile in profiles]
+
+    groups = {}
+    for profile in profiles:
+        groups.setdefault(query_shape(profile.get('car_preferences', {})), []).append(profile)
+    plan = []
+    for group in groups.values():
+        if len(group) == 1:
+            plan.append(PlannedQuery(group[0].get('car_preferences', {}), [ProfileRoute(group[0], None, None, None)]))
+        else:
+            plan.append(_merge(group))
+    return plan
+
+
+def _split_by_model(query):
+    """One query per model of a multi-model query, keeping its routes (and so its seen-state namespace)"""
+    models = query.prefs.get('models') or []
+    if len(models) < 2:
+        return [query]
+    return [PlannedQuery(dict(query.prefs, models=[model]), query.routes) for model in models]
+
+
+def shard_plan(plan, shard_index, shard_count):
+    """The slice of a plan that worker shard_index of shard_count runs.
+
+    Queries are ordered deterministically before being dealt out round-robin, and a plan with
+    fewer queries than workers is split per model first, so every worker gets the same slice
+    on every run and each search runs on exactly one worker.
+    """
+    if shard_count <= 1:
+        return plan
+    units = plan
+    if len(plan) < shard_count:
+        units = [unit for query in plan for unit in _split_by_model(query)]
+    units = sorted(units, key=lambda query: (query.namespace, ",".join(map(str, query.prefs.get('models') or []))))
+    return units[shard_index::shard_count]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Per-run timing spans and counters
+Every scrape run records how long each stage took (driver setup, page load, feed wait,
+extraction, image downloads, SMTP) plus a few counters, and exports them as one JSON line
+and optionally as a Prometheus textfile for node_exporter's textfile collector
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+PROMETHEUS_PREFIX = "yad2_scraper"
+QUANTILES = (0.5, 0.95)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+class RunMetrics:
+    """Timing spans and counters collected during one scrape run (thread-safe)"""
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        self._spans = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block under `stage`; failures are timed too"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        """Record one duration for a stage"""
+        with self._lock:
+            self._spans.setdefault(stage, []).append(seconds)
+
+    def incr(self, counter, amount=1):
+        """Increase a run counter"""
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def summary(self):
+        """Return the run as a JSON-serializable dict with per-stage count/total/p50/p95/max"""
+        with self._lock:
+            spans = {stage: sorted(values) for stage, values in self._spans.items()}
+            counters = dict(self._counters)
+
+        stages = {}
+        for stage, values in spans.items():
+            stages[stage] = {
+                'count': len(values),
+                'total_seconds': round(sum(values), 4),
+                'p50_seconds': round(percentile(values, 0.5), 4),
+                'p95_seconds': round(percentile(values, 0.95), 4),
+                'max_seconds': round(values[-1], 4),
+            }
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'duration_seconds': round(time.perf_counter() - self._start, 4),
+            'counters': counters,
+            'stages': stages,
+        }
+
+    def write_jsonl(self, path, summary=None):
+        """Append this run as one JSON line"""
+        summary = summary or self.summary()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+    def write_prometheus(self, path, summary=None):
+        """Atomically rewrite a Prometheus textfile with the latest run's metrics"""
+        summary = summary or self.summary()
+        with self._lock:
+            spans = {stage: sorted(values) for stage, values in self._spans.items()}
+
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds Time spent in each scrape stage during the last run",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary",
+        ]
+        for stage, values in sorted(spans.items()):
+            for quantile in QUANTILES:
+                lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                             f'{percentile(values, quantile):.6f}')
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {sum(values):.6f}')
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_count{{stage="{stage}"}} {len(values)}')
+
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_run_events Counters of the last run (listings found, new cars, failures)",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_events gauge",
+        ]
+        for counter, value in sorted(summary['counters'].items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_run_events{{event="{counter}"}} {value}')
+
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_run_duration_seconds Wall time of the last run",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds {summary['duration_seconds']}",
+            f"# HELP {PROMETHEUS_PREFIX}_last_run_timestamp_seconds When the last run finished",
+            f"# TYPE {PROMETHEUS_PREFIX}_last_run_timestamp_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_last_run_timestamp_seconds {time.time():.0f}",
+        ]
+
+        # The textfile collector may read at any moment, so never expose a half-written file
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def export(self, jsonl_path=None, prometheus_path=None):
+        """Write the run to the configured sinks and return its summary"""
+        summary = self.summary()
+        if jsonl_path:
+            self.write_jsonl(jsonl_path, summary)
+        if prometheus_path:
+            self.write_prometheus(prometheus_path, summary)
+        return summary
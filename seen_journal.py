@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Append-only seen-state journal
+A git-friendly alternative to the SQLite seen-store: a compact snapshot plus a journal that
+each run only appends new IDs to (with a one-line header). The journal is periodically
+compacted into the snapshot, every write is atomic (write-then-rename), and runs that find
+nothing new write nothing, so the workflow has nothing to commit
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from seen_store import DEFAULT_NAMESPACE, SeenStore
+
+SNAPSHOT_NAME = 'snapshot.jsonl'
+JOURNAL_NAME = 'journal.jsonl'
+SNAPSHOT_FORMAT = 'yad2-seen-snapshot'
+
+# Profiles save concurrently; each journal directory is written by one thread at a time
+_dir_locks = {}
+_dir_locks_lock = threading.Lock()
+
+
+def _lock_for(journal_dir):
+    """Return the lock guarding a journal directory"""
+    with _dir_locks_lock:
+        return _dir_locks.setdefault(os.path.abspath(journal_dir), threading.Lock())
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _read_lines(path):
+    """Return the JSON values of a JSON-lines file ([] if it does not exist)"""
+    if not os.path.exists(path):
+        return []
+    values = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                values.append(json.loads(line))
+            except ValueError:
+                print(f"⚠️ Skipping unreadable line {line_number} of {path}")
+    return values
+
+
+def _atomic_write(path, text):
+    """Write a file via a temporary file and rename, so readers never see a partial write"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _snapshot_header(journal_dir):
+    """Return the snapshot's header line ({} if there is no snapshot yet)"""
+    path = os.path.join(journal_dir, SNAPSHOT_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline() or '{}')
+        except ValueError:
+            return {}
+    return header if isinstance(header, dict) else {}
+
+
+def _merge(entries, namespace, car_id, first_seen, last_seen):
+    """Fold one record into {namespace: {id: [first_seen, last_seen]}}; replaying is idempotent"""
+    current = entries.setdefault(namespace, {}).get(car_id)
+    if current is None:
+        entries[namespace][car_id] = [first_seen, last_seen]
+    else:
+        current[0] = min(current[0], first_seen)
+        current[1] = max(current[1], last_seen)
+
+
+def _replay_journal(records, entries, last_checks):
+    """Fold journal blocks (a header line, then [id, first_seen, last_seen] lines) into the state"""
+    namespace = DEFAULT_NAMESPACE
+    for record in records:
+        if isinstance(record, dict):
+            # Block header: the entries that follow belong to this namespace
+            namespace = record.get('ns', DEFAULT_NAMESPACE)
+            if record.get('last_check'):
+                last_checks[namespace] = max(record['last_check'], last_checks.get(namespace) or '')
+        else:
+            _merge(entries, namespace, *record)
+
+
+def replay(journal_dir, extra_journals=()):
+    """Rebuild the state from the snapshot plus the journal (and any extra journal-format files).
+
+    Returns ({namespace: {id: [first_seen, last_seen]}}, {namespace: last_check}, journal_line_count).
+    """
+    entries = {}
+    last_checks = {}
+
+    for record in _read_lines(os.path.join(journal_dir, SNAPSHOT_NAME)):
+        if isinstance(record, dict):
+            last_checks.update(record.get('last_check') or {})
+        else:
+            _merge(entries, *record)
+
+    journal = _read_lines(os.path.join(journal_dir, JOURNAL_NAME))
+    _replay_journal(journal, entries, last_checks)
+    for path in extra_journals:
+        _replay_journal(_read_lines(path), entries, last_checks)
+    return entries, last_checks, len(journal)
+
+
+def merge_deltas(journal_dir, delta_paths, compact_after_entries=1000, ttl_days=90, max_entries=5000):
+    """Append shard workers' delta journals to the canonical journal; returns the number of entries merged.
+
+    Replay keeps the earliest first_seen and latest last_seen of every ID, so merging is a
+    grow-only set union: the order of the deltas does not matter and merging one twice is harmless.
+    """
+    blocks = []
+    merged = 0
+    for path in sorted(delta_paths):
+        records = _read_lines(path)
+        if records and not isinstance(records[0], dict):
+            records.insert(0, {'ns': DEFAULT_NAMESPACE})
+        merged += sum(1 for record in records if not isinstance(record, dict))
+        blocks.extend(_dumps(record) for record in records)
+    if not blocks:
+        return 0
+
+    journal_path = os.path.join(journal_dir, JOURNAL_NAME)
+    with _lock_for(journal_dir):
+        existing = ""
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                existing = f.read()
+        if existing and not existing.endswith("\n"):
+            existing += "\n"
+        _atomic_write(journal_path, existing + "\n".join(blocks) + "\n")
+        if compact_after_entries and existing.count("\n") + len(blocks) >= compact_after_entries:
+            compact(journal_dir, ttl_days, max_entries)
+    return merged
+
+
+def compact(journal_dir, ttl_days=90, max_entries=5000, sqlite_imported=False):
+    """Fold the journal into a fresh snapshot (applying eviction) and empty the journal.
+
+    A crash between the two renames only leaves journal records that are already in the
+    snapshot, which replay() merges harmlessly.
+    """
+    entries, last_checks, _ = replay(journal_dir)
+    header = {'format': SNAPSHOT_FORMAT, 'version': 1, 'last_check': dict(sorted(last_checks.items()))}
+    if sqlite_imported or _snapshot_header(journal_dir).get('sqlite_imported'):
+        header['sqlite_imported'] = True
+    lines = [_dumps(header)]
+    for namespace in sorted(entries):
+        pruned = SeenStore(ttl_days=ttl_days, max_entries=max_entries, namespace=namespace)
+        pruned._entries = entries[namespace]
+        pruned.evict()
+        for car_id in sorted(pruned._entries):
+            lines.append(_dumps([namespace, car_id, *pruned._entries[car_id]]))
+    _atomic_write(os.path.join(journal_dir, SNAPSHOT_NAME), "\n".join(lines) + "\n")
+    _atomic_write(os.path.join(journal_dir, JOURNAL_NAME), "")
+    return len(lines) - 1
+
+
+def _read_sqlite_state(sqlite_path, legacy_json_path):
+    """Return the blocks of every namespace in a SeenStore database (or the legacy seen_cars.json).
+
+    The database is opened read-only, so a file without seen-store tables is left untouched.
+    """
+    blocks = {}
+    if os.path.exists(sqlite_path):
+        conn = sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True, timeout=30)
+        try:
+            tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if 'seen_listings' in tables:
+                for namespace, car_id, first_seen, last_seen in conn.execute(
+                        "SELECT namespace, id, first_seen, last_seen FROM seen_listings ORDER BY namespace, id"):
+                    blocks.setdefault(namespace, ({'ns': namespace}, []))[1].append([car_id, first_seen, last_seen])
+            if 'meta' in tables:
+                for namespace, last_check in conn.execute("SELECT namespace, value FROM meta WHERE key = 'last_check'"):
+                    if last_check:
+                        blocks.setdefault(namespace, ({'ns': namespace}, []))[0]['last_check'] = last_check
+        finally:
+            conn.close()
+    if not blocks and legacy_json_path and os.path.exists(legacy_json_path):
+        try:
+            with open(legacy_json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not migrate {legacy_json_path}: {e}")
+            return blocks
+        timestamp = legacy.get('last_check') or datetime.now().isoformat()
+        header = {'ns': DEFAULT_NAMESPACE}
+        if legacy.get('last_check'):
+            header['last_check'] = legacy['last_check']
+        blocks[DEFAULT_NAMESPACE] = (header, [[car_id, timestamp, timestamp] for car_id in legacy.get('seen_car_ids', [])])
+    return blocks
+
+
+def import_sqlite(journal_dir, sqlite_path='seen_cars.db', legacy_json_path='seen_cars.json', ttl_days=90,
+                  max_entries=5000):
+    """Import every namespace of the SQLite seen-store (or seen_cars.json) once; returns the entries imported.
+
+    The snapshot header records that the import is done, so later runs never read the old
+    files again (seen_cars.db lives on as the notification outbox).
+    """
+    with _lock_for(journal_dir):
+        if _snapshot_header(journal_dir).get('sqlite_imported'):
+            return 0
+        blocks = _read_sqlite_state(sqlite_path, legacy_json_path)
+        lines = []
+        for namespace in sorted(blocks):
+            header, records = blocks[namespace]
+            lines.append(_dumps(header))
+            lines.extend(_dumps(record) for record in records)
+        journal_path = os.path.join(journal_dir, JOURNAL_NAME)
+        if lines:
+            existing = ""
+            if os.path.exists(journal_path):
+                with open(journal_path, 'r', encoding='utf-8') as f:
+                    existing = f.read()
+            if existing and not existing.endswith("\n"):
+                existing += "\n"
+            _atomic_write(journal_path, existing + "\n".join(lines) + "\n")
+        compact(journal_dir, ttl_days, max_entries, sqlite_imported=True)
+    imported = sum(len(records) for _, records in blocks.values())
+    if imported:
+        print(f"🔄 Imported {imported} seen cars from {sqlite_path} into {journal_dir}/")
+    return imported
+
+
+class JournalSeenStore(SeenStore):
+    """SeenStore persisted as snapshot + append-only journal instead of SQLite"""
+
+    def __init__(self, journal_dir='seen_state', compact_after_entries=1000, touch_resolution_days=7,
+                 delta_path=None, **kwargs):
+        # `path`/`legacy_json_path` from kwargs are only read to migrate older state
+        super().__init__(**kwargs)
+        self.journal_dir = journal_dir
+        # Shard workers append to their own delta file and leave journal_dir untouched (see merge_deltas)
+        self.delta_path = delta_path
+        self.compact_after_entries = compact_after_entries
+        self.touch_resolution = timedelta(days=touch_resolution_days)
+        # car_id -> last_seen as last written to disk
+        self._persisted = {}
+
+    def load(self):
+        """Replay the snapshot and journal; import SQLite/legacy JSON state the first time"""
+        if not self.delta_path:
+            import_sqlite(self.journal_dir, self.path, self.legacy_json_path, self.ttl_days, self.max_entries)
+        extra_journals = [self.delta_path] if self.delta_path else []
+        with _lock_for(self.journal_dir):
+            entries, last_checks, _ = replay(self.journal_dir, extra_journals)
+            imported = _snapshot_header(self.journal_dir).get('sqlite_imported')
+        if self.namespace in entries:
+            self._entries = entries[self.namespace]
+            self.last_check = last_checks.get(self.namespace)
+            self._persisted = {car_id: last_seen for car_id, (_, last_seen) in self._entries.items()}
+            return self
+
+        # Shard workers must not rewrite journal_dir, so until the merge job has run the
+        # one-time import they carry the namespace's SQLite IDs over in their delta instead
+        if not imported and (os.path.exists(self.path) or (self.namespace == DEFAULT_NAMESPACE and self.legacy_json_path
+                                                           and os.path.exists(self.legacy_json_path))):
+            # SeenStore.load reads the SQLite file (migrating seen_cars.json if there is no database)
+            super().load()
+            if self._entries:
+                print(f"🔄 Importing {len(self._entries)} seen cars for '{self.namespace}' into {self.journal_dir}/")
+            self._dirty_ids = set(self._entries)
+        return self
+
+    def _needs_write(self, car_id):
+        """New IDs are always journaled; last_seen refreshes only once per touch_resolution"""
+        persisted_last_seen = self._persisted.get(car_id)
+        if persisted_last_seen is None:
+            return True
+        last_seen = self._entries[car_id][1]
+        try:
+            return datetime.fromisoformat(last_seen) - datetime.fromisoformat(persisted_last_seen) >= self.touch_resolution
+        except ValueError:
+            return last_seen != persisted_last_seen
+
+    def save(self):
+        """Append new (and long-unrefreshed) IDs to the journal; write nothing on no-op runs"""
+        self.evict()
+        changed = sorted(car_id for car_id in self._dirty_ids if car_id in self._entries and self._needs_write(car_id))
+        self._dirty_ids.clear()
+        # Eviction is recomputed from the timestamps at compaction, so it needs no journal record
+        self._evicted_ids.clear()
+        if not changed:
+            return
+
+        header = {'ns': self.namespace, 'at': datetime.now().isoformat(timespec='seconds')}
+        if self.last_check:
+            header['last_check'] = self.last_check
+        block = [_dumps(header)] + [_dumps([car_id, *self._entries[car_id]]) for car_id in changed]
+
+        journal_path = self.delta_path or os.path.join(self.journal_dir, JOURNAL_NAME)
+        with _lock_for(os.path.dirname(journal_path) or '.'):
+            existing = ""
+            if os.path.exists(journal_path):
+                with open(journal_path, 'r', encoding='utf-8') as f:
+                    existing = f.read()
+            if existing and not existing.endswith("\n"):
+                existing += "\n"
+            _atomic_write(journal_path, existing + "\n".join(block) + "\n")
+            for car_id in changed:
+                self._persisted[car_id] = self._entries[car_id][1]
+
+            journal_lines = existing.count("\n") + len(block)
+            if not self.delta_path and self.compact_after_entries and journal_lines >= self.compact_after_entries:
+                kept = compact(self.journal_dir, self.ttl_days, self.max_entries)
+                print(f"🗜️ Compacted the seen-state journal into a {kept}-entry snapshot")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Seen-listing store
+Keeps previously seen car IDs in an in-memory hash index backed by a small SQLite file,
+with first-seen/last-seen timestamps and TTL/size-based eviction
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+
+DEFAULT_NAMESPACE = 'default'
+
+
+class SeenStore:
+    """Constant-time seen-ID lookups with bounded on-disk state"""
+
+    def __init__(self, path='seen_cars.db', legacy_json_path='seen_cars.json', ttl_days=90, max_entries=5000,
+                 namespace=DEFAULT_NAMESPACE):
+        self.path = path
+        # Each search profile keeps its own set of seen IDs inside the same file
+        self.namespace = namespace
+        self.legacy_json_path = legacy_json_path
+        self.ttl_days = ttl_days
+        self.max_entries = max_entries
+        self.last_check = None
+        # car_id -> [first_seen, last_seen] (isoformat strings)
+        self._entries = {}
+        self._dirty_ids = set()
+        self._evicted_ids = set()
+
+    def __contains__(self, car_id):
+        return car_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, car_id, now=None):
+        """Record a newly seen listing"""
+        now = now or datetime.now().isoformat()
+        entry = self._entries.get(car_id)
+        if entry:
+            entry[1] = now
+        else:
+            self._entries[car_id] = [now, now]
+        self._evicted_ids.discard(car_id)
+        self._dirty_ids.add(car_id)
+
+    def touch(self, car_id, now=None):
+        """Refresh the last-seen time of a listing that is still on the page"""
+        entry = self._entries.get(car_id)
+        if entry:
+            entry[1] = now or datetime.now().isoformat()
+            self._dirty_ids.add(car_id)
+
+    def _connect(self):
+        """Open the SQLite file, creating the tables if needed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_listings ("
+            "namespace TEXT NOT NULL, id TEXT NOT NULL, first_seen TEXT NOT NULL, last_seen TEXT NOT NULL, "
+            "PRIMARY KEY (namespace, id))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, PRIMARY KEY (namespace, key))"
+        )
+        return conn
+
+    def load(self):
+        """Load the store from SQLite, migrating the legacy seen_cars.json on first use"""
+        is_new = not os.path.exists(self.path)
+        conn = self._connect()
+        try:
+            if is_new and self.legacy_json_path and os.path.exists(self.legacy_json_path):
+                self._migrate_legacy_json(conn)
+
+            self._entries = {
+                car_id: [first_seen, last_seen]
+                for car_id, first_seen, last_seen in conn.execute(
+                    "SELECT id, first_seen, last_seen FROM seen_listings WHERE namespace = ?",
+                    (self.namespace,)
+                )
+            }
+            row = conn.execute(
+                "SELECT value FROM meta WHERE namespace = ? AND key = 'last_check'",
+                (self.namespace,)
+            ).fetchone()
+            self.last_check = row[0] if row else None
+        finally:
+            conn.close()
+        return self
+
+    def _migrate_legacy_json(self, conn):
+        """Import the IDs from the old list-based seen_cars.json into the default namespace"""
+        try:
+            with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not migrate {self.legacy_json_path}: {e}")
+            return
+
+        timestamp = legacy.get('last_check') or datetime.now().isoformat()
+        car_ids = legacy.get('seen_car_ids', [])
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_listings (namespace, id, first_seen, last_seen) VALUES (?, ?, ?, ?)",
+                [(DEFAULT_NAMESPACE, car_id, timestamp, timestamp) for car_id in car_ids]
+            )
+            if legacy.get('last_check'):
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (namespace, key, value) VALUES (?, 'last_check', ?)",
+                    (DEFAULT_NAMESPACE, legacy['last_check'])
+                )
+        print(f"🔄 Migrated {len(car_ids)} seen cars from {self.legacy_json_path} to {self.path}")
+
+    def evict(self, now=None):
+        """Drop listings not seen within the TTL, then the oldest ones beyond max_entries"""
+        now = now or datetime.now()
+        if self.ttl_days:
+            cutoff = (now - timedelta(days=self.ttl_days)).isoformat()
+            expired = [car_id for car_id, (_, last_seen) in self._entries.items() if last_seen < cutoff]
+            for car_id in expired:
+                del self._entries[car_id]
+            self._evicted_ids.update(expired)
+
+        if self.max_entries and len(self._entries) > self.max_entries:
+            by_last_seen = sorted(self._entries, key=lambda car_id: self._entries[car_id][1])
+            overflow = by_last_seen[:len(self._entries) - self.max_entries]
+            for car_id in overflow:
+                del self._entries[car_id]
+            self._evicted_ids.update(overflow)
+
+        self._dirty_ids.difference_update(self._evicted_ids)
+        return len(self._evicted_ids)
+
+    def save(self):
+        """Write changed and evicted rows to SQLite"""
+        self.evict()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO seen_listings (namespace, id, first_seen, last_seen) VALUES (?, ?, ?, ?)",
+                    [(self.namespace, car_id, *self._entries[car_id]) for car_id in self._dirty_ids]
+                )
+                conn.executemany(
+                    "DELETE FROM seen_listings WHERE namespace = ? AND id = ?",
+                    [(self.namespace, car_id) for car_id in self._evicted_ids]
+                )
+                if self.last_check:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (namespace, key, value) VALUES (?, 'last_check', ?)",
+                        (self.namespace, self.last_check)
+                    )
+        finally:
+            conn.close()
+        self._dirty_ids.clear()
+        self._evicted_ids.clear()
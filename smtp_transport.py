@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Persistent SMTP transport
+Opens one SMTP connection lazily (connect, STARTTLS, login) and reuses it for every
+message sent during a run, reconnecting if the server drops it
+"""
+
+import smtplib
+import threading
+
+
+def parse_recipients(recipients):
+    """Turn a comma-separated string or a list into a clean list of addresses"""
+    if isinstance(recipients, str):
+        recipients = recipients.split(',')
+    return [address.strip() for address in recipients or [] if address and address.strip()]
+
+
+class SmtpTransport:
+    """Reusable SMTP connection shared by all emails of a run"""
+
+    def __init__(self, smtp_server, smtp_port, sender_email, sender_password, use_starttls=True, timeout=30):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.use_starttls = use_starttls
+        self.timeout = timeout
+        self._server = None
+        # Profiles send concurrently; SMTP sessions are strictly sequential
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open and authenticate a new SMTP session"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_starttls:
+                server.starttls()  # Enable encryption
+            if self.sender_password:
+                server.login(self.sender_email, self.sender_password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        print(f"🔌 Connected to SMTP server {self.smtp_server}:{self.smtp_port}")
+
+    def _ensure_connected(self):
+        """Connect on first use, or reconnect if the session went stale"""
+        if self._server is None:
+            self._connect()
+            return
+        try:
+            status, _ = self._server.noop()
+        except smtplib.SMTPException:
+            status = None
+        except OSError:
+            status = None
+        if status != 250:
+            self._drop()
+            self._connect()
+
+    def _drop(self):
+        """Forget the current session without raising"""
+        if self._server is not None:
+            try:
+                self._server.close()
+            except Exception:
+                pass
+        self._server = None
+
+    def send(self, msg, recipients):
+        """Send one message to one or more recipients over the shared connection"""
+        recipients = parse_recipients(recipients)
+        text = msg.as_string()
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    self._ensure_connected()
+                    self._server.sendmail(self.sender_email, recipients, text)
+                    return
+                except smtplib.SMTPException as e:
+                    # SMTPException subclasses OSError: a bad login, refused recipients or a rejected
+                    # message would fail the same way again, so only a dropped connection is retried
+                    if not isinstance(e, smtplib.SMTPServerDisconnected):
+                        raise
+                    self._drop()
+                    if attempt == 1:
+                        raise
+                except OSError:
+                    # The socket died mid-send; reconnect once and retry
+                    self._drop()
+                    if attempt == 1:
+                        raise
+
+    def close(self):
+        """Politely end the SMTP session"""
+        with self._lock:
+            if self._server is not None:
+                try:
+                    self._server.quit()
+                except Exception:
+                    pass
+            self._server = None
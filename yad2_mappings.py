@@ -4,7 +4,11 @@ Yad2 Parameter Mappings
 Maps human-readable car preferences to yad2.co.il URL parameters
 """
 
-# Constants for car model keys
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from model_catalogue import get_catalogue
+
+# Constants for car model keys; their codes come from the model catalogue (data/yad2_models.json)
 PEUGEOT_3008 = "peugeot 3008"
 FORD_FOCUS = "ford focus"
 SUZUKI_CROSSOVER = "suzuki crossover"
@@ -26,19 +30,6 @@ ONE_OWNER = "1"
 TWO_OWNERS = "2"
 THREE_OWNERS = "3"
 
-# Car Models - maps model names to yad2 model codes
-CAR_MODELS = {
-    PEUGEOT_3008: "10661",  
-    FORD_FOCUS: "10598",
-    SUZUKI_CROSSOVER: "10490",
-    HONDA_CIVIC: "10182",
-    TOYOTA_COROLLA: "10226",
-    HYUNDAI_I30: "10276",
-    HYUNDAI_IONIQ: "10279",
-    LEXUS_IS: "10321",
-    LEXUS_CT: "10317",
-}
-
 # Engine Types
 ENGINE_TYPES = {
     GASOLINE: "1101",
@@ -60,15 +51,11 @@ PREVIOUS_OWNERS = {
 
 
 def get_model_codes(model_names):
-    """Convert list of model names to yad2 model codes"""
-    codes = []
-    for name in model_names:
-        name_clean = name.strip().lower()
-        for model_key, code in CAR_MODELS.items():
-            if name_clean == model_key.lower():
-                codes.append(code)
-                break
-    return codes
+    """Convert list of model names to yad2 model codes via the model catalogue.
+
+    Raises model_catalogue.UnknownModelError (with suggestions) for names it does not know.
+    """
+    return get_catalogue().codes(model_names)
 
 def get_engine_code(engine_type):
     """Convert engine type to yad2 code"""
@@ -92,4 +79,20 @@ def format_year_range(min_year, max_year):
     """Format year range for yad2 URL"""
     min_val = min_year if min_year else -1
     max_val = max_year if max_year else -1
-    return f"{min_val}-{max_val}" 
\ No newline at end of file
+    return f"{min_val}-{max_val}" 
+
+def format_image_url(image_url, width):
+    """Ask the yad2 image CDN for a rendition `width` pixels wide (height scaled to match)"""
+    if not image_url or not width:
+        return image_url
+    parts = urlsplit(image_url)
+    params = dict(parse_qsl(parts.query))
+    old_width = params.get('w')
+    if old_width and old_width.isdigit() and int(old_width) <= width:
+        return image_url  # Already small enough
+    if old_width and old_width.isdigit() and params.get('h', '').isdigit():
+        params['h'] = str(round(int(params['h']) * width / int(old_width)))
+    else:
+        params.pop('h', None)
+    params['w'] = str(width)
+    return urlunsplit(parts._replace(query=urlencode(params)))